@@ -16,6 +16,8 @@ PEER_TIMEOUT = 300       # Seconds before considering a peer offline (5 minutes)
 
 # User interface settings
 DEFAULT_VERBOSE_MODE = True
+COMMAND_HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".lsnp_history")
+COMMAND_HISTORY_LENGTH = 500
 
 # Discovery settings
 DEFAULT_SCAN_TIMEOUT = 5  # Seconds
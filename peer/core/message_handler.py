@@ -4,7 +4,6 @@ Message Handler Module
 Handles different types of messages (POST, DM, PROFILE, etc.)
 """
 import time
-import secrets
 import json
 import sys
 import os
@@ -14,6 +13,8 @@ import base64
 # Add parent directories to path for protocol access
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from protocol.protocol import Protocol
+from peer.utils.formatting import format_file_size
+from peer.utils.message_ids import generate_message_id
 
 # ANSI Color codes for board display
 class Colors:
@@ -25,6 +26,14 @@ class Colors:
     RESET = '\033[0m'     # Reset to default color
     BOLD = '\033[1m'      # Bold text
 
+# Tic-Tac-Toe: symbols that occupy a cell, and the eight winning lines
+_PLAYER_SYMBOLS = frozenset(('X', 'O'))
+_WIN_LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+)
+
 
 class MessageHandler:
     """Handles processing and routing of different message types"""
@@ -146,8 +155,6 @@ class MessageHandler:
     
     def handle_profile_message(self, msg_dict, addr):
         """Handle profile update messages"""
-        import datetime
-
         user_id = msg_dict.get('USER_ID', 'Unknown')
         display_name = msg_dict.get('DISPLAY_NAME', 'Unknown')
         status = msg_dict.get('STATUS', '')
@@ -186,8 +193,6 @@ class MessageHandler:
 
     def handle_post_message(self, msg_dict, addr):
         """Handle broadcast POST messages"""
-        import datetime
-
         user_id = msg_dict.get('USER_ID', 'Unknown')
         content = msg_dict.get('CONTENT', '')
         timestamp = msg_dict.get('TIMESTAMP', None)
@@ -245,8 +250,6 @@ class MessageHandler:
     
     def handle_dm_message(self, msg_dict, addr):
         """Handle direct messages"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', '')
         content = msg_dict.get('CONTENT', '')
@@ -356,23 +359,22 @@ class MessageHandler:
         # Track this post in the peer manager
         self.peer_manager.add_post(timestamp, content, ttl)
         
-        # Get only peers who follow you
-        followers = self.peer_manager.get_followers()
-        follower_peers = {}
-        
-        # Create a filtered dictionary containing only followers
-        for user_id in followers:
-            if user_id in self.peer_manager.known_peers:
-                follower_peers[user_id] = self.peer_manager.known_peers[user_id]
+        # Addresses of known peers who follow you, collected in one pass
+        known_peers = self.peer_manager.known_peers
+        follower_addresses = [
+            (known_peers[user_id]['ip'], known_peers[user_id]['port'])
+            for user_id in self.peer_manager.get_followers()
+            if user_id in known_peers
+        ]
         
         # If no followers, inform the user
-        if not follower_peers:
+        if not follower_addresses:
             if self.verbose_mode:
                 print(f"No followers to send POST message to")
             return 0
                 
-        # Broadcast only to followers
-        sent_count = self.network_manager.broadcast_to_peers(message, follower_peers)
+        # Broadcast only to followers; the message is encoded once for all of them
+        sent_count = self.network_manager.send_to_addresses(message, follower_addresses)
         return sent_count
     
     def send_dm_message(self, recipient, content):
@@ -450,7 +452,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             peer_info = self.peer_manager.get_peer_info(target_user_id)
             if peer_info:
@@ -497,7 +498,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             peer_info = self.peer_manager.get_peer_info(target_user_id)
             if peer_info:
@@ -534,7 +534,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             peer_info = self.peer_manager.get_peer_info(target_user_id)
             if peer_info:
@@ -571,7 +570,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             peer_info = self.peer_manager.get_peer_info(target_user_id)
             if peer_info:
@@ -620,7 +618,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             print(f"\nSEND > [{ts_str}] To multiple recipients | Type: GROUP_CREATE")
             print(f"TYPE: GROUP_CREATE")
@@ -636,19 +633,7 @@ class MessageHandler:
         self.handle_group_create(message, ('127.0.0.1', 0))
         
         # Send to all specified members except self
-        sent_count = 0
-        for member_id in member_set:
-            if member_id == self.peer_manager.user_id:
-                continue
-                
-            peer_info = self.peer_manager.get_peer_info(member_id)
-            if peer_info:
-                if self.network_manager.send_to_address(message, peer_info['ip'], peer_info['port']):
-                    sent_count += 1
-                    
-        return sent_count
-        
-        return sent_count
+        return self._send_to_members(message, member_set)
     
     def send_group_update(self, group_id, add_members=None, remove_members=None):
         """Send a group update message to all members"""
@@ -694,7 +679,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             print(f"\nSEND > [{ts_str}] To group members | Type: GROUP_UPDATE")
             print(f"TYPE: GROUP_UPDATE")
@@ -718,17 +702,7 @@ class MessageHandler:
         members.update(add_set)
         
         # Send message
-        sent_count = 0
-        for member_id in members:
-            if member_id == self.peer_manager.user_id:
-                continue
-                
-            peer_info = self.peer_manager.get_peer_info(member_id)
-            if peer_info:
-                if self.network_manager.send_to_address(message, peer_info['ip'], peer_info['port']):
-                    sent_count += 1
-                    
-        return sent_count
+        return self._send_to_members(message, members)
     
     def send_group_message(self, group_id, content):
         """Send a message to a group"""
@@ -765,7 +739,6 @@ class MessageHandler:
         
         # Log the message if in verbose mode
         if self.verbose_mode:
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
             print(f"\nSEND > [{ts_str}] To group {group_name} | Type: GROUP_MESSAGE")
             print(f"TYPE: GROUP_MESSAGE")
@@ -784,18 +757,7 @@ class MessageHandler:
         
         # Send to all members except self
         members = self.peer_manager.get_group_members(group_id)
-        sent_count = 0
-        
-        for member_id in members:
-            if member_id == self.peer_manager.user_id:
-                continue
-                
-            peer_info = self.peer_manager.get_peer_info(member_id)
-            if peer_info:
-                if self.network_manager.send_to_address(message, peer_info['ip'], peer_info['port']):
-                    sent_count += 1
-                    
-        return sent_count
+        return self._send_to_members(message, members)
         # Check if group exists and we are a member
         if not self.peer_manager.is_group_member(group_id):
             return 0
@@ -827,9 +789,19 @@ class MessageHandler:
         
         return sent_count
     
+    def _send_to_members(self, message, member_ids):
+        """Send one message to every known member except self, returning the sent count"""
+        user_id = self.peer_manager.user_id
+        known_peers = self.peer_manager.known_peers
+        recipients = {member_id: known_peers[member_id] for member_id in member_ids
+                      if member_id != user_id and member_id in known_peers}
+        if not recipients:
+            return 0
+        return self.network_manager.broadcast_to_peers(message, recipients)
+    
     def _generate_message_id(self):
         """Generate a unique message ID"""
-        return secrets.token_hex(8)
+        return generate_message_id()
         
     def list_dms_from_peer(self, peer_id):
         """List all direct messages exchanged with a specific peer"""
@@ -879,7 +851,7 @@ class MessageHandler:
                 
             creator_status = " (Creator)" if group['creator'] == self.peer_manager.user_id else ""
             member_count = len(group['members'])
-            message_count = len(self.peer_manager.group_messages.get(group_id, []))
+            message_count = len(self.peer_manager.group_messages.get(group_id, ()))
             
             print(f"{i}. {group['name']} (ID: {group_id}){creator_status}")
             print(f"   Members: {member_count} | Messages: {message_count}")
@@ -976,8 +948,6 @@ class MessageHandler:
 
     def handle_follow_request(self, msg_dict, addr):
         """Handle follow request from another peer"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', '')
         timestamp = msg_dict.get('TIMESTAMP', None)
@@ -1024,8 +994,6 @@ class MessageHandler:
 
     def handle_unfollow_request(self, msg_dict, addr):
         """Handle unfollow request from another peer"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', '')
         timestamp = msg_dict.get('TIMESTAMP', None)
@@ -1072,8 +1040,6 @@ class MessageHandler:
 
     def handle_follow_response(self, msg_dict, addr):
         """Handle response to a follow request"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', '')
         status = msg_dict.get('STATUS', 'false').lower() == 'true'
@@ -1116,8 +1082,6 @@ class MessageHandler:
 
     def handle_unfollow_response(self, msg_dict, addr):
         """Handle response to an unfollow request"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', '')
         status = msg_dict.get('STATUS', 'false').lower() == 'true'
@@ -1161,8 +1125,6 @@ class MessageHandler:
     # Group message handlers
     def handle_group_create(self, msg_dict, addr):
         """Handle group creation messages"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         group_id = msg_dict.get('GROUP_ID', '')
         group_name = msg_dict.get('GROUP_NAME', '')
@@ -1212,8 +1174,6 @@ class MessageHandler:
     
     def handle_group_update(self, msg_dict, addr):
         """Handle group update messages"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         group_id = msg_dict.get('GROUP_ID', '')
         add_members_str = msg_dict.get('ADD', '')
@@ -1265,7 +1225,6 @@ class MessageHandler:
             
         # Update group in peer manager
         self.peer_manager.update_group(group_id, from_user, add_members, remove_members)
-        import datetime
 
         from_user = msg_dict.get('FROM', 'Unknown')
         group_id = msg_dict.get('GROUP_ID', '')
@@ -1308,6 +1267,7 @@ class MessageHandler:
         for member in remove_members:
             if member in group['members'] and member != group['creator']:
                 group['members'].remove(member)
+        self.peer_manager.invalidate_group_cache()
         
         if self.verbose_mode:
             # Format timestamp
@@ -1333,8 +1293,6 @@ class MessageHandler:
     
     def handle_group_message(self, msg_dict, addr):
         """Handle messages to groups"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         group_id = msg_dict.get('GROUP_ID', '')
         content = msg_dict.get('CONTENT', '')
@@ -1384,8 +1342,6 @@ class MessageHandler:
     # Like/Unlike message handling
     def handle_like_message(self, msg_dict, addr):
         """Handle like/unlike messages"""
-        import datetime
-
         from_user = msg_dict.get('FROM', 'Unknown')
         to_user = msg_dict.get('TO', 'Unknown')
         post_timestamp = msg_dict.get('POST_TIMESTAMP', '')
@@ -1547,9 +1503,9 @@ class MessageHandler:
         return False
     
     def send_tictactoe_move(self, game_id, position):
-        """Send a Tic-Tac-Toe move"""
+        """Send a Tic-Tac-Toe move, returning the updated game state or None on failure"""
         if game_id not in self.active_games:
-            return False
+            return None
         
         game = self.active_games[game_id]
         current_player = self.peer_manager.user_id
@@ -1564,11 +1520,11 @@ class MessageHandler:
         
         # Validate it's our turn
         if game['current_turn'] != player_symbol:
-            return False
+            return None
         
         # Validate position is available
         if not self._is_valid_move(game['board'], position):
-            return False
+            return None
         
         # Make the move
         game['board'][position] = player_symbol
@@ -1600,9 +1556,9 @@ class MessageHandler:
             self._send_game_result(game_id, result, opponent)
         
         peer_info = self.peer_manager.get_peer_info(opponent)
-        if peer_info:
-            return self.network_manager.send_to_address(message, peer_info['ip'], peer_info['port'])
-        return False
+        if peer_info and self.network_manager.send_to_address(message, peer_info['ip'], peer_info['port']):
+            return game
+        return None
     
     def handle_tictactoe_invite(self, msg_dict, addr):
         """Handle incoming Tic-Tac-Toe game invitation"""
@@ -1841,28 +1797,17 @@ class MessageHandler:
         """Check if a move is valid"""
         if position < 0 or position > 8:
             return False
-        return board[position] not in ['X', 'O']
+        return board[position] not in _PLAYER_SYMBOLS
     
     def _check_game_result(self, board):
         """Check if the game has ended and return result"""
-        # Check rows
-        for i in range(0, 9, 3):
-            if board[i] == board[i+1] == board[i+2] and board[i] in ['X', 'O']:
-                return {'finished': True, 'winner': board[i], 'winning_line': [i, i+1, i+2]}
-        
-        # Check columns
-        for i in range(3):
-            if board[i] == board[i+3] == board[i+6] and board[i] in ['X', 'O']:
-                return {'finished': True, 'winner': board[i], 'winning_line': [i, i+3, i+6]}
-        
-        # Check diagonals
-        if board[0] == board[4] == board[8] and board[0] in ['X', 'O']:
-            return {'finished': True, 'winner': board[0], 'winning_line': [0, 4, 8]}
-        if board[2] == board[4] == board[6] and board[2] in ['X', 'O']:
-            return {'finished': True, 'winner': board[2], 'winning_line': [2, 4, 6]}
+        # Rows, then columns, then diagonals
+        for a, b, c in _WIN_LINES:
+            if board[a] == board[b] == board[c] and board[a] in _PLAYER_SYMBOLS:
+                return {'finished': True, 'winner': board[a], 'winning_line': [a, b, c]}
         
         # Check for draw
-        if all(cell in ['X', 'O'] for cell in board):
+        if all(cell in _PLAYER_SYMBOLS for cell in board):
             return {'finished': True, 'winner': None, 'winning_line': None}
         
         # Game continues
@@ -1917,7 +1862,7 @@ class MessageHandler:
             print(f"\n{Colors.CYAN}📁 File Offer Received!{Colors.RESET}")
             print(f"From: {Colors.YELLOW}{sender_name}{Colors.RESET}")
             print(f"File: {Colors.BLUE}{filename}{Colors.RESET}")
-            print(f"Size: {self._format_file_size(int(file_size))}")
+            print(f"Size: {format_file_size(int(file_size))}")
             print(f"Type: {file_type}")
             print(f"Description: {description}")
             print(f"Transfer ID: {transfer_id}")
@@ -1941,7 +1886,8 @@ class MessageHandler:
             chunk_number = int(chunk_number)
             total_chunks = int(total_chunks)
             
-            print(f"Debug: Received chunk {chunk_number}/{total_chunks}, data length: {len(chunk_data)}")
+            if self.verbose_mode:
+                print(f"Debug: Received chunk {chunk_number}/{total_chunks}, data length: {len(chunk_data)}")
             
             # Initialize receiving file structure if needed
             if transfer_id not in self.receiving_files:
@@ -1951,7 +1897,8 @@ class MessageHandler:
                     'received_count': 0,
                     'sender_addr': addr
                 }
-                print(f"Debug: Initialized receiving structure for {transfer_id}")
+                if self.verbose_mode:
+                    print(f"Debug: Initialized receiving structure for {transfer_id}")
             
             # Store the chunk
             if chunk_number not in self.receiving_files[transfer_id]['chunks']:
@@ -1963,9 +1910,10 @@ class MessageHandler:
                 
                 # Check if all chunks received
                 if received == total_chunks:
-                    print(f"Debug: All chunks received, reassembling file...")
+                    if self.verbose_mode:
+                        print(f"Debug: All chunks received, reassembling file...")
                     self._reassemble_file(transfer_id)
-            else:
+            elif self.verbose_mode:
                 print(f"Debug: Chunk {chunk_number} already received, skipping")
             
         except Exception as e:
@@ -2006,9 +1954,10 @@ class MessageHandler:
             total_chunks = file_info['total_chunks']
             sender_addr = file_info['sender_addr']
             
-            print(f"Debug: File info total_chunks: {total_chunks}")
-            print(f"Debug: Available chunks: {list(chunks.keys())}")
-            print(f"Debug: Chunk count: {len(chunks)}")
+            if self.verbose_mode:
+                print(f"Debug: File info total_chunks: {total_chunks}")
+                print(f"Debug: Available chunks: {list(chunks.keys())}")
+                print(f"Debug: Chunk count: {len(chunks)}")
             
             # Get file offer info
             if transfer_id not in self.pending_file_offers:
@@ -2020,13 +1969,15 @@ class MessageHandler:
             
             # Reassemble file data
             file_data = b''
-            print(f"Debug: Reassembling {total_chunks} chunks...")
+            if self.verbose_mode:
+                print(f"Debug: Reassembling {total_chunks} chunks...")
             for i in range(total_chunks):
                 if i in chunks:
                     try:
                         chunk_bytes = base64.b64decode(chunks[i])
                         file_data += chunk_bytes
-                        print(f"Debug: Chunk {i} decoded: {len(chunk_bytes)} bytes")
+                        if self.verbose_mode:
+                            print(f"Debug: Chunk {i} decoded: {len(chunk_bytes)} bytes")
                     except Exception as e:
                         print(f"{Colors.RED}Error decoding chunk {i}: {e}{Colors.RESET}")
                         self._send_file_received(transfer_id, sender_addr, 'decode_error')
@@ -2036,8 +1987,9 @@ class MessageHandler:
                     self._send_file_received(transfer_id, sender_addr, 'missing_chunks')
                     return
             
-            print(f"Debug: Total reassembled file size: {len(file_data)} bytes")
-            print(f"Debug: File data preview: {file_data[:50]}...")
+            if self.verbose_mode:
+                print(f"Debug: Total reassembled file size: {len(file_data)} bytes")
+                print(f"Debug: File data preview: {file_data[:50]}...")
             
             # Save file to downloads directory
             downloads_dir = os.path.join(os.getcwd(), 'downloads')
@@ -2058,7 +2010,7 @@ class MessageHandler:
             
             print(f"\n{Colors.GREEN}📁 File saved successfully!{Colors.RESET}")
             print(f"Location: {Colors.BLUE}{file_path}{Colors.RESET}")
-            print(f"Size: {self._format_file_size(len(file_data))}")
+            print(f"Size: {format_file_size(len(file_data))}")
             
             # Send confirmation
             self._send_file_received(transfer_id, sender_addr, 'success')
@@ -2080,7 +2032,7 @@ class MessageHandler:
                 'TYPE': 'FILE_RECEIVED',
                 'transfer_id': transfer_id,
                 'status': status,
-                'receiver_name': self.peer_manager.get_self_info().get('name', 'Unknown')
+                'receiver_name': self.peer_manager.get_self_name()
             }
             
             self.network_manager.send_to_address(msg_dict, addr[0], addr[1])
@@ -2088,32 +2040,16 @@ class MessageHandler:
         except Exception as e:
             print(f"{Colors.RED}Error sending file received confirmation: {e}{Colors.RESET}")
     
-    def _format_file_size(self, size_bytes):
-        """Format file size in human readable format"""
-        if size_bytes == 0:
-            return "0 B"
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024.0 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        return f"{size_bytes:.1f} {size_names[i]}"
-    
     def handle_file_accept(self, msg_dict, addr):
         """Handle FILE_ACCEPT message"""
-        print(f"Debug: FILE_ACCEPT handler called from {addr}")
-        print(f"Debug: Message content: {msg_dict}")
-        
         try:
             transfer_id = msg_dict.get('transfer_id')
             receiver_name = msg_dict.get('receiver_name', f"Unknown@{addr[0]}")
             
-            print(f"Debug: Received FILE_ACCEPT for transfer {transfer_id}")
-            print(f"Debug: Active transfers: {list(self.active_file_transfers.keys())}")
-            
             if transfer_id not in self.active_file_transfers:
                 print(f"{Colors.RED}Error: Transfer {transfer_id} not found{Colors.RESET}")
-                print(f"Debug: Available transfers: {list(self.active_file_transfers.keys())}")
+                if self.verbose_mode:
+                    print(f"Active transfers: {len(self.active_file_transfers)}")
                 return
             
             transfer_info = self.active_file_transfers[transfer_id]
@@ -2163,42 +2099,34 @@ class MessageHandler:
         try:
             chunk_size = 64 * 1024  # 64KB chunks
             
-            print(f"Debug: Reading file from path: {file_path}")
             with open(file_path, 'rb') as f:
-                file_data = f.read()
-            
-            print(f"Debug: File data length: {len(file_data)} bytes")
-            print(f"Debug: File data preview: {file_data[:50]}...")
-            
-            # Calculate chunks
-            total_chunks = (len(file_data) + chunk_size - 1) // chunk_size
-            
-            print(f"Sending {total_chunks} chunks...")
-            
-            for chunk_num in range(total_chunks):
-                start = chunk_num * chunk_size
-                end = min(start + chunk_size, len(file_data))
-                chunk_data = file_data[start:end]
-                
-                print(f"Debug: Chunk {chunk_num}: {len(chunk_data)} bytes")
+                # Size comes from the open file; chunks are read one at a time
+                # so the whole file is never held in memory
+                file_size = os.fstat(f.fileno()).st_size
+                total_chunks = (file_size + chunk_size - 1) // chunk_size
                 
-                # Encode chunk as base64
-                chunk_b64 = base64.b64encode(chunk_data).decode('utf-8')
+                print(f"Sending {total_chunks} chunks...")
                 
-                # Send chunk
-                msg_dict = {
-                    'TYPE': 'FILE_CHUNK',
-                    'transfer_id': transfer_id,
-                    'chunk_number': str(chunk_num),
-                    'total_chunks': str(total_chunks),
-                    'chunk_data': chunk_b64
-                }
-                
-                self.network_manager.send_to_address(msg_dict, addr[0], addr[1])
-                print(f"Sent chunk {chunk_num + 1}/{total_chunks}")
-                
-                # Small delay to avoid overwhelming receiver
-                time.sleep(0.1)
+                for chunk_num in range(total_chunks):
+                    chunk_data = f.read(chunk_size)
+                    
+                    # Encode chunk as base64
+                    chunk_b64 = base64.b64encode(chunk_data).decode('ascii')
+                    
+                    # Send chunk
+                    msg_dict = {
+                        'TYPE': 'FILE_CHUNK',
+                        'transfer_id': transfer_id,
+                        'chunk_number': str(chunk_num),
+                        'total_chunks': str(total_chunks),
+                        'chunk_data': chunk_b64
+                    }
+                    
+                    self.network_manager.send_to_address(msg_dict, addr[0], addr[1])
+                    print(f"Sent chunk {chunk_num + 1}/{total_chunks}")
+                    
+                    # Small delay to avoid overwhelming receiver
+                    time.sleep(0.1)
             
             print(f"{Colors.GREEN}✅ File transfer completed!{Colors.RESET}")
             print(f"Waiting for confirmation from receiver...")
@@ -2215,6 +2143,10 @@ class MessageHandler:
     def get_game_info(self, game_id):
         """Get information about a specific game"""
         return self.active_games.get(game_id)
+    
+    def get_active_games_info(self):
+        """Get (game_id, game_info) pairs for all active games"""
+        return list(self.active_games.items())
 
             
     def handle_token_revocation(self, msg_dict, addr):
@@ -2255,6 +2187,7 @@ class MessageHandler:
             # Remove from user profiles
             if user_id in self.peer_manager.user_profiles:
                 del self.peer_manager.user_profiles[user_id]
+                self.peer_manager.invalidate_group_cache()
             
             # Remove from followers and following lists
             if user_id in self.peer_manager.followers:
@@ -2288,7 +2221,7 @@ class MessageHandler:
             'USER_ID': self.peer_manager.user_id,
             'TOKEN': token,
             'TIMESTAMP': str(int(time.time())),
-            'MESSAGE_ID': secrets.token_hex(8)
+            'MESSAGE_ID': self._generate_message_id()
         }
         
         # If target user specified, send only to them
@@ -2299,4 +2232,4 @@ class MessageHandler:
             return False
             
         # Otherwise broadcast to all known peers
-        return self.network_manager.broadcast_to_peers(message)
+        return self.network_manager.broadcast_to_peers(message, self.peer_manager.get_all_peers())
@@ -6,7 +6,6 @@ Modular P2P peer using separated concerns and clean architecture
 import sys
 import os
 import time
-import secrets
 
 # Add parent directory to path for protocol access
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,6 +15,7 @@ from peer.discovery.peer_manager import PeerManager
 from peer.core.message_handler import MessageHandler
 from peer.ui.user_interface import UserInterface
 from peer.config.settings import DEFAULT_VERBOSE_MODE
+from peer.utils.message_ids import generate_message_id
 
 
 class UDPPeerModular:
@@ -145,12 +145,12 @@ class UDPPeerModular:
                 'TYPE': 'REVOKE',
                 'USER_ID': self.peer_manager.user_id,
                 'TIMESTAMP': str(int(time.time())),
-                'MESSAGE_ID': secrets.token_hex(8)
+                'MESSAGE_ID': generate_message_id()
             }
             
-            # Send to all peers
-            peers = self.peer_manager.get_all_peers()
-            sent_count = self.network_manager.broadcast_to_peers(message, peers)
+            # Send the one message to every peer address in a single pass
+            destinations = [(info['ip'], info['port']) for info in self.peer_manager.get_all_peers().values()]
+            sent_count = self.network_manager.send_to_addresses(message, destinations)
             print(f"Sent token revocation to {sent_count} peers")
         except Exception as e:
             print(f"Error sending token revocation: {e}")
@@ -4,7 +4,8 @@ Token Handler Module
 Handles token revocation and validation operations
 """
 import time
-import secrets
+
+from peer.utils.message_ids import generate_message_id
 
 class TokenHandler:
     """Handles token-related operations"""
@@ -53,7 +54,7 @@ class TokenHandler:
             'USER_ID': self.peer_manager.user_id,
             'TOKEN': token,
             'TIMESTAMP': str(int(time.time())),
-            'MESSAGE_ID': secrets.token_hex(8)
+            'MESSAGE_ID': generate_message_id()
         }
         
         # If target user specified, send only to them
@@ -64,4 +65,4 @@ class TokenHandler:
             return False
             
         # Otherwise broadcast to all known peers
-        return self.network_manager.broadcast_to_peers(message)
+        return self.network_manager.broadcast_to_peers(message, self.peer_manager.get_all_peers())
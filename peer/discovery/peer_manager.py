@@ -4,10 +4,12 @@ Peer Discovery Module
 Handles peer discovery, tracking, and management
 """
 import time
+import datetime
 import threading
-import secrets
+from types import MappingProxyType
 from peer.config.settings import DISCOVERY_INTERVAL, PEER_TIMEOUT, TOKEN_CLEANUP_INTERVAL
 from peer.security.token_manager import TokenManager
+from peer.utils.message_ids import generate_message_id
 
 class PeerManager:
     """Manages peer discovery, tracking, and cleanup"""
@@ -34,9 +36,14 @@ class PeerManager:
         self.groups = {}  # group_id -> {'name': str, 'creator': user_id, 'members': set(), 'created_at': timestamp}
         self.created_groups = set()  # Set of group_ids I've created
         self.group_messages = {}  # group_id -> [{'from_user': str, 'content': str, 'timestamp': int}]
+        # Group caches are tagged with the _group_version they were built from;
+        # invalidate_group_cache bumps it so entries built before a change are never used
+        self._group_version = 0
+        self._my_groups_cache = None  # (version, [group_ids]) or None
+        self._group_member_rows = {}  # group_id -> (version, [(user_id, display_name, is_self, is_creator)])
         
         # Post likes functionality
-        self.liked_posts = set()  # Set of post_timestamps I've liked
+        self.liked_posts = {}  # (post_author, post_timestamp) -> time I liked it
         self.post_likes = {}  # post_timestamp -> set(user_ids who liked it)
         self.my_posts = {}  # timestamp -> {'content': str, 'ttl': int, 'created_at': int}
         self.received_posts = {}  # user_id -> {timestamp -> {'content': str, 'ttl': int, 'created_at': int}}
@@ -44,6 +51,9 @@ class PeerManager:
         # Token management
         self.token_manager = TokenManager()
         
+        # Cached display name of the current user (see get_self_name)
+        self._self_name_cache = None
+        
         # Discovery state
         self.user_id = ""
         self.network_manager = None
@@ -64,6 +74,8 @@ class PeerManager:
     def set_user_id(self, user_id):
         """Set the current user ID"""
         self.user_id = user_id
+        self._self_name_cache = None
+        self.invalidate_group_cache()
     
     def start_discovery(self):
         """Start periodic peer discovery"""
@@ -119,7 +131,6 @@ class PeerManager:
         # Log PING if message handler has verbose mode on
         message_handler = getattr(self.network_manager, 'message_handler', None)
         if message_handler and getattr(message_handler, 'verbose_mode', False):
-            import datetime
             ts_str = datetime.datetime.fromtimestamp(int(ping_message['TIMESTAMP'])).strftime('%Y-%m-%d %H:%M:%S')
             print(f"\nSEND > [{ts_str}] | Type: PING (Periodic)")
             print(f"TYPE: PING")
@@ -211,6 +222,12 @@ class PeerManager:
             self.user_profiles[user_id]['display_name'] = display_name
         self.user_profiles[user_id]['avatar'] = has_avatar
         self.user_profiles[user_id]['avatar_type'] = avatar_type
+        
+        if user_id == self.user_id:
+            self._self_name_cache = None
+        
+        # Display names appear in the cached group member rows
+        self.invalidate_group_cache()
     
     def get_display_name(self, user_id):
         """Get display name for a user, fallback to user_id if not available"""
@@ -227,6 +244,25 @@ class PeerManager:
             return "[AVATAR]"
         return ""
     
+    def snapshot_peers(self, user_ids):
+        """Get (user_id, display_name, avatar_info, is_following, is_follower) for each user"""
+        profiles = self.user_profiles
+        following = self.following
+        followers = self.followers
+        snapshot = []
+        for user_id in user_ids:
+            profile = profiles.get(user_id)
+            display_name = user_id
+            avatar_info = ""
+            if profile:
+                display_name = profile.get('display_name') or user_id
+                if profile.get('avatar'):
+                    avatar_type = profile.get('avatar_type', '')
+                    avatar_info = f"[AVATAR]({avatar_type})" if avatar_type else "[AVATAR]"
+            snapshot.append((user_id, display_name, avatar_info,
+                             user_id in following, user_id in followers))
+        return snapshot
+    
     def get_self_info(self):
         """Get information about the current user"""
         return {
@@ -234,6 +270,12 @@ class PeerManager:
             'name': self.get_display_name(self.user_id) if self.user_id else 'Unknown'
         }
     
+    def get_self_name(self):
+        """Get the current user's display name, cached until the profile changes"""
+        if self._self_name_cache is None:
+            self._self_name_cache = self.get_self_info().get('name', 'Unknown')
+        return self._self_name_cache
+    
     def cleanup_old_peers(self):
         """Remove peers that haven't been seen recently"""
         current_time = time.time()
@@ -249,6 +291,7 @@ class PeerManager:
             del self.known_peers[user_id]
             if user_id in self.user_profiles:
                 del self.user_profiles[user_id]
+                self.invalidate_group_cache()
             
             # Remove from followers and following lists
             if user_id in self.followers:
@@ -272,6 +315,10 @@ class PeerManager:
         """Get all peer information"""
         return self.known_peers.copy()
     
+    def peers_view(self):
+        """Get a read-only live view of all peer information (no copy)"""
+        return MappingProxyType(self.known_peers)
+    
     def is_peer_known(self, user_id):
         """Check if a peer is known"""
         return user_id in self.known_peers
@@ -381,7 +428,8 @@ class PeerManager:
         # Check if user is creator
         if creator_id == self.user_id:
             self.created_groups.add(group_id)
-            
+        
+        self.invalidate_group_cache()
         return True
         
     def update_group(self, group_id, updater_id, add_members=None, remove_members=None):
@@ -404,7 +452,8 @@ class PeerManager:
             for member in remove_members:
                 if member in self.groups[group_id]['members']:
                     self.groups[group_id]['members'].remove(member)
-                    
+        
+        self.invalidate_group_cache()
         return True
     
     def join_group(self, group_id, group_name, creator, members=None, created_at=None):
@@ -413,6 +462,7 @@ class PeerManager:
             # Group already exists, just make sure we're in it
             if self.user_id not in self.groups[group_id]['members']:
                 self.groups[group_id]['members'].append(self.user_id)
+            self.invalidate_group_cache()
             self.my_groups.add(group_id)
             return True, "Joined existing group"
         
@@ -430,6 +480,7 @@ class PeerManager:
         }
         
         # Add to my groups
+        self.invalidate_group_cache()
         self.my_groups.add(group_id)
         
         return True, "Joined new group"
@@ -447,13 +498,9 @@ class PeerManager:
         if self.user_id in self.groups[group_id]['members']:
             self.groups[group_id]['members'].remove(self.user_id)
         
+        self.invalidate_group_cache()
         return True, "Left group successfully"
     
-    def get_my_groups(self):
-        """Get groups the user is a member of"""
-        return [group_id for group_id, group in self.groups.items() 
-                if self.user_id in group['members']]
-    
     def is_in_group(self, group_id):
         """Check if user is in a group"""
         return (group_id in self.groups and 
@@ -470,6 +517,7 @@ class PeerManager:
         
         # Delete group
         del self.groups[group_id]
+        self.invalidate_group_cache()
         
         # Remove from created groups
         if group_id in self.created_groups:
@@ -558,9 +606,44 @@ class PeerManager:
         return group and group['creator'] == user_id
     
     def get_my_groups(self):
-        """Get list of groups the user is a member of"""
-        return [group_id for group_id, group in self.groups.items() 
-                if self.user_id in group['members']]
+        """Get list of groups the user is a member of, rebuilt only after group changes"""
+        version = self._group_version
+        cache = self._my_groups_cache
+        if cache is not None and cache[0] == version:
+            return list(cache[1])
+        
+        # Copy the items: the listener thread may add groups while we scan
+        my_groups = [group_id for group_id, group in list(self.groups.items())
+                     if self.user_id in group['members']]
+        # Skip the store if a change landed while we were building
+        if self._group_version == version:
+            self._my_groups_cache = (version, my_groups)
+        return list(my_groups)
+    
+    def invalidate_group_cache(self):
+        """Forget cached group lists and member rows after group, membership or name changes"""
+        self._group_version += 1
+        self._my_groups_cache = None
+        self._group_member_rows.clear()
+    
+    def get_group_member_rows(self, group_id):
+        """Get (user_id, display_name, is_self, is_creator) for each member, rebuilt only after changes"""
+        version = self._group_version
+        cached = self._group_member_rows.get(group_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        group = self.groups.get(group_id)
+        if not group:
+            return []
+        creator = group['creator']
+        rows = [(member_id, self.get_display_name(member_id) or member_id,
+                 member_id == self.user_id, member_id == creator)
+                for member_id in list(group['members'])]
+        # Skip the store if a change landed while we were building
+        if self._group_version == version:
+            self._group_member_rows[group_id] = (version, rows)
+        return rows
     
     def is_in_group(self, group_id):
         """Check if user is in a group"""
@@ -573,7 +656,7 @@ class PeerManager:
     
     def _generate_message_id(self):
         """Generate a unique message ID"""
-        return secrets.token_hex(8)
+        return generate_message_id()
         
     def store_direct_message(self, from_user, to_user, content, timestamp):
         """Store a direct message"""
@@ -695,8 +778,7 @@ class PeerManager:
     def like_post(self, post_author, post_timestamp):
         """Like a post"""
         # Track that the current user has liked this post
-        like_key = f"{post_author}:{post_timestamp}"
-        self.liked_posts.add(like_key)
+        self.liked_posts[(post_author, post_timestamp)] = time.time()
         
         # Add the like to the post
         if post_timestamp not in self.post_likes:
@@ -708,9 +790,7 @@ class PeerManager:
     def unlike_post(self, post_author, post_timestamp):
         """Unlike a post"""
         # Remove from liked posts
-        like_key = f"{post_author}:{post_timestamp}"
-        if like_key in self.liked_posts:
-            self.liked_posts.remove(like_key)
+        self.liked_posts.pop((post_author, post_timestamp), None)
         
         # Remove the like from the post
         if post_timestamp in self.post_likes and self.user_id in self.post_likes[post_timestamp]:
@@ -720,8 +800,7 @@ class PeerManager:
         
     def has_liked_post(self, post_author, post_timestamp):
         """Check if the user has liked a post"""
-        like_key = f"{post_author}:{post_timestamp}"
-        return like_key in self.liked_posts
+        return (post_author, post_timestamp) in self.liked_posts
         
     def get_post_likes(self, post_timestamp):
         """Get users who liked a post"""
@@ -730,7 +809,19 @@ class PeerManager:
     def get_post_likes_count(self, post_timestamp):
         """Get the number of likes for a post"""
         return len(self.post_likes.get(post_timestamp, set()))
-        
+
+    def get_post_likes_counts_bulk(self, post_timestamps):
+        """Get the number of likes for several posts in one pass
+
+        Args:
+            post_timestamps (iterable): Timestamps of the posts to count
+
+        Returns:
+            dict: Dictionary of timestamp -> like count
+        """
+        post_likes = self.post_likes
+        return {ts: len(post_likes.get(ts, ())) for ts in post_timestamps}
+
     def get_post_content(self, post_timestamp):
         """Get the content of a post
         
@@ -842,7 +933,7 @@ class PeerManager:
     
     def _generate_message_id(self):
         """Generate a unique message ID"""
-        return secrets.token_hex(8)
+        return generate_message_id()
         created_at = post['created_at']
         ttl = post['ttl']
         
@@ -3,8 +3,10 @@
 Network Layer Module
 Handles all network communication including UDP sockets, broadcasting, and peer connections
 """
+import errno
 import socket
 import threading
+import queue
 import random
 import time
 import sys
@@ -53,6 +55,10 @@ class NetworkManager:
         self.message_handler = None  # Reference to the message handler for logging
         self.running = False
         
+        # Outgoing messages queued by callers that must not wait on the socket
+        self.send_queue = queue.SimpleQueue()
+        self.writer_thread = None
+        
     def _get_local_ip(self):
         """Get the local IP address"""
         try:
@@ -61,7 +67,7 @@ class NetworkManager:
             ip = s.getsockname()[0]
             s.close()
             return ip
-        except:
+        except OSError:
             return '127.0.0.1'
     
     def register_message_handler(self, message_type, handler_func):
@@ -82,11 +88,22 @@ class NetworkManager:
             discovery_thread = threading.Thread(target=self._listen_discovery_socket)
             discovery_thread.daemon = True
             discovery_thread.start()
+        
+        # Start writer for queued sends
+        self.writer_thread = threading.Thread(target=self._drain_send_queue)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
     
     def stop_listening(self):
         """Stop listening for messages"""
         self.running = False
         
+        # Let the writer flush what is already queued before the socket closes
+        if self.writer_thread is not None:
+            self.send_queue.put(None)
+            self.writer_thread.join(timeout=1.0)
+            self.writer_thread = None
+        
         # Safely close sockets
         try:
             if hasattr(self, 'socket') and self.socket:
@@ -104,37 +121,31 @@ class NetworkManager:
     
     def _listen_main_socket(self):
         """Listen for messages on main socket"""
-        while self.running:
-            try:
-                data, addr = self.socket.recvfrom(SOCKET_BUFFER_SIZE)
-                self._handle_message(data, addr)
-            except OSError as e:
-                # Handle specific Windows socket errors more gracefully
-                if e.winerror == 10054:  # Connection forcibly closed
-                    # Silently ignore this error when someone disconnects
-                    continue
-                elif self.running:  # Only log other errors if we're supposed to be running
-                    print(f"Error receiving message on main socket: {e}")
-            except Exception as e:
-                if self.running:  # Only log if we're supposed to be running
-                    print(f"Error receiving message on main socket: {e}")
+        self._listen(self.socket, "message on main socket")
     
     def _listen_discovery_socket(self):
         """Listen for discovery messages"""
+        self._listen(self.discovery_socket, "discovery message")
+    
+    def _listen(self, sock, what):
+        """Receive datagrams from sock and dispatch them until listening stops"""
+        recvfrom = sock.recvfrom
+        handle = self._handle_message
         while self.running:
             try:
-                data, addr = self.discovery_socket.recvfrom(SOCKET_BUFFER_SIZE)
-                self._handle_message(data, addr)
+                data, addr = recvfrom(SOCKET_BUFFER_SIZE)
             except OSError as e:
-                # Handle specific Windows socket errors more gracefully
-                if e.winerror == 10054:  # Connection forcibly closed
-                    # Silently ignore this error when someone disconnects
+                # Windows reports an ICMP port-unreachable from an earlier send as
+                # WSAECONNRESET (10054) on the next receive; it is harmless
+                if getattr(e, 'winerror', None) == 10054:
                     continue
-                elif self.running:  # Only log other errors if we're supposed to be running
-                    print(f"Error receiving discovery message: {e}")
-            except Exception as e:
-                if self.running:  # Only log if we're supposed to be running
-                    print(f"Error receiving discovery message: {e}")
+                # A closed socket fails every call; stop instead of spinning
+                if e.errno in (errno.EBADF, errno.ENOTSOCK):
+                    break
+                if self.running:  # Only log other errors if we're supposed to be running
+                    print(f"Error receiving {what}: {e}")
+                continue
+            handle(data, addr)
     
     def _handle_message(self, data, addr):
         """Process incoming messages and route to appropriate handlers"""
@@ -144,8 +155,10 @@ class NetworkManager:
             
             # Skip token validation for discovery and profile related messages
             # Token validation will be done at the message handler level
-            # Debug: Show all incoming messages
-            if msg_type.startswith('FILE_'):
+            verbose = self.message_handler is not None and self.message_handler.verbose_mode
+            
+            # Debug: Show incoming file messages (chunk payloads included) in verbose mode only
+            if verbose and msg_type.startswith('FILE_'):
                 print(f"Debug: Received {msg_type} message from {addr}")
                 print(f"Debug: Message content: {msg_dict}")
             
@@ -153,7 +166,8 @@ class NetworkManager:
                 self.message_handlers[msg_type](msg_dict, addr)
             else:
                 print(f"Unknown message type: {msg_type}")
-                print(f"Debug: Available handlers: {list(self.message_handlers.keys())}")
+                if verbose:
+                    print(f"Debug: Available handlers: {list(self.message_handlers.keys())}")
                 
         except Exception as e:
             print(f"Error processing message from {addr}: {e}")
@@ -179,6 +193,22 @@ class NetworkManager:
             print(f"Error sending to {ip}:{port}: {e}")
             return False
     
+    def enqueue_send(self, data, ip, port):
+        """Queue data for the writer thread and return immediately"""
+        if self.writer_thread is None:
+            # Not started (or already stopped): send inline instead
+            return self.send_to_address(data, ip, port)
+        self.send_queue.put((data, ip, port))
+        return True
+    
+    def _drain_send_queue(self):
+        """Writer thread: send queued messages until the None sentinel arrives"""
+        while True:
+            item = self.send_queue.get()
+            if item is None:
+                break
+            self.send_to_address(*item)
+    
     def broadcast_discovery(self, message):
         """Broadcast a discovery message"""
         try:
@@ -205,10 +235,28 @@ class NetworkManager:
             print("Cannot broadcast to peers: Socket is closed")
             return 0
             
+        return self.send_to_addresses(
+            data, [(peer_info['ip'], peer_info['port']) for peer_info in peer_list.values()])
+    
+    def send_to_addresses(self, data, addresses):
+        """Send the same data to every (ip, port) in addresses, encoding it once"""
+        # Check if socket is still valid (not closed)
+        if not hasattr(self, 'socket') or self.socket is None:
+            print("Cannot send to addresses: Socket is closed")
+            return 0
+            
+        # Encode once and reuse the same bytes for every destination
+        if isinstance(data, dict):
+            data = Protocol.encode_message(data)
+            
+        sendto = self.socket.sendto
         sent_count = 0
-        for peer_info in peer_list.values():
-            if self.send_to_address(data, peer_info['ip'], peer_info['port']):
+        for address in addresses:
+            try:
+                sendto(data, address)
                 sent_count += 1
+            except Exception as e:
+                print(f"Error sending to {address[0]}:{address[1]}: {e}")
         return sent_count
     
     def get_network_info(self):
@@ -4,83 +4,248 @@ User Interface Module
 Handles user interaction and command processing
 """
 import os
+import sys
+import stat
 import base64
 import mimetypes
 import time
 import secrets
-import time
+import datetime
+import functools
+import heapq
+import itertools
+import atexit
+from collections import namedtuple
+
+# Line editing and history are optional (readline is missing on Windows)
+try:
+    import readline
+except ImportError:
+    readline = None
 
 # Add at top of file
-from peer.config.settings import DEFAULT_VERBOSE_MODE
+from peer.config.settings import DEFAULT_VERBOSE_MODE, COMMAND_HISTORY_FILE, COMMAND_HISTORY_LENGTH
+from peer.utils.formatting import format_file_size
+
+# Main command loop prompt, banner and invalid-command help
+_COMMAND_NAMES = "POST, DM, DMLIST, PROFILE, LIST, FOLLOW, UNFOLLOW, FOLLOWING, FOLLOWERS, GAME, FILE, GROUP, GROUPVIEW, FEED, LIKE, VERBOSE"
+_PROMPT = "\nCommand (" + _COMMAND_NAMES.replace(", ", "/") + "/QUIT): "
+_BANNER = "\nPeer-to-Peer Chat Ready!\nCommands: " + _COMMAND_NAMES + ", QUIT"
+_INVALID_HELP = (
+    "Invalid command. Use " + _COMMAND_NAMES + ", or QUIT\n"
+    "You can also use single letters: P, D, DL, PROF, LS, UF, G, GV, F, L, V, Q\n"
+)
+
+# Header and options for a single group's detail submenu
+_GROUP_SUBMENU_TMPL = (
+    "\n===== {name} (ID: {gid}) =====\n"
+    "  1. View all members\n"
+    "  2. View all messages\n"
+    "  3. Send a message\n"
+    "  0. Back to group overview\n"
+)
+
+# Menu choice -> UserInterface method name for the numbered submenus
+_GROUP_DETAIL_ACTIONS = {
+    "1": "_show_group_detail_members",
+    "2": "_show_group_detail_messages",
+    "3": "_send_group_detail_message",
+}
+_FEED_ACTIONS = {
+    "1": "_show_my_posts",
+    "2": "_show_following_posts",
+    "3": "_show_liked_posts",
+}
+_LIKE_ACTIONS = {
+    "1": "_handle_like_post",
+    "2": "_handle_unlike_post",
+    "3": "_handle_view_likes",
+}
+
+# Our side and the opponent's side of a tic-tac-toe game
+_GameRoles = namedtuple('_GameRoles', 'our_symbol opponent_symbol opponent_uid opponent_name')
+
+# Avatar read size; a multiple of 3 so per-chunk base64 output concatenates cleanly
+_AVATAR_READ_CHUNK = 3 * 4096
+
+# File extension -> MIME type, filled on first use of each extension; seeded
+# with the usual avatar formats so PROFILE never has to load the system table
+_MIME_CACHE = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+}
+
+def _guess_file_type(path):
+    """Guess a file's MIME type, caching the answer per extension"""
+    ext = os.path.splitext(path)[1].lower()
+    file_type = _MIME_CACHE.get(ext)
+    if file_type is None:
+        file_type, encoding = mimetypes.guess_type(path)
+        file_type = file_type or "application/octet-stream"
+        # Compressed names like .tar.gz depend on more than the last extension
+        if encoding is None:
+            _MIME_CACHE[ext] = file_type
+    return file_type
+
+def _trunc(s, n=30):
+    """Cut text to n characters, marking the cut with an ellipsis"""
+    if not isinstance(s, str):
+        raise TypeError(f"_trunc expects text, got {type(s).__name__}")
+    return s if len(s) <= n else s[:n] + "..."
+
+@functools.lru_cache(maxsize=128)
+def _format_epoch_seconds(seconds):
+    """Format whole epoch seconds as local date and time"""
+    return datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
 
 class UserInterface:
     """Handles user interaction and command processing"""
     
+    # Keywords that end the command loop
+    _QUIT_COMMANDS = frozenset(('QUIT', 'Q'))
+    
+    # Command keyword or alias -> handler method name (handler takes no arguments)
+    _COMMAND_DISPATCH = {
+        'VERBOSE': '_handle_verbose_command',
+        'V': '_handle_verbose_command',
+        'POST': '_handle_post_command',
+        'P': '_handle_post_command',
+        'DM': '_handle_dm_command',
+        'D': '_handle_dm_command',
+        'DMLIST': '_handle_dmlist_command',
+        'DL': '_handle_dmlist_command',
+        'PROFILE': '_handle_profile_command',
+        'PROF': '_handle_profile_command',
+        'FEED': '_handle_feed_command',
+        'F': '_handle_feed_command',
+        'LIKE': '_handle_like_command',
+        'L': '_handle_like_command',
+        'LIST': '_handle_list_command',
+        'LS': '_handle_list_command',
+        'FOLLOW': '_handle_follow_command',
+        'UNFOLLOW': '_handle_unfollow_command',
+        'UF': '_handle_unfollow_command',
+        'FOLLOWING': '_handle_following_command',
+        'FOLLOWERS': '_handle_followers_command',
+        'GROUP': '_handle_group_command',
+        'GROUPVIEW': '_handle_group_overview',
+        'GV': '_handle_group_overview',
+    }
+    
+    # Commands with subcommands -> handler method name (handler takes the raw command)
+    _PREFIX_DISPATCH = {
+        'GAME': '_handle_game_command',
+        'G': '_handle_game_command',
+        'FILE': '_handle_file_command',
+    }
+    
+    # FILE subcommand -> handler method name; every handler takes the split command
+    _FILE_DISPATCH = {
+        'SEND': '_handle_file_send_command',
+        'ACCEPT': '_handle_file_accept_command',
+        'REJECT': '_handle_file_reject_command',
+        'LIST': '_handle_file_list_command',
+        'STATUS': '_handle_file_status_command',
+    }
+    
+    # GAME argument count -> handler method name; other counts are invalid
+    _GAME_HANDLERS = {
+        1: '_game_help',
+        2: '_game_two_args',
+        3: '_game_three_args',
+        4: '_game_four_args',
+    }
+    
+    # Valid GAME symbols and board positions
+    _GAME_SYMBOLS = frozenset(('X', 'O'))
+    _VALID_POSITIONS = range(9)
+    _POSITION_DIGITS = frozenset('012345678')
+    
+    # Most peers listed when a GAME invitation target is not found
+    _MAX_SUGGESTED_PEERS = 20
+    
+    # Help text printed by the GAME and FILE commands
+    _GAME_HELP = "\n".join([
+        "\n🎮 Tic-Tac-Toe Game Commands:",
+        "  GAME <user@ip> O         - Invite user to play (you are O)",
+        "  GAME <user@ip> X <pos>   - Invite and make first move",
+        "  GAME <game_id> <pos>     - Make a move (position 0-8)",
+        "  GAME LIST                - Show active games",
+    ])
+    _GAME_USAGE = "\n".join([
+        "Invalid GAME command format.",
+        "Usage:",
+        "  GAME                      - Show help and active games",
+        "  GAME <user@ip> O          - Invite user (you are O)",
+        "  GAME <user@ip> X <pos>    - Invite and make first move",
+        "  GAME <game_id> <pos>      - Make a move (position 0-8)",
+        "  GAME LIST                 - Show active games",
+    ])
+    _FILE_USAGE = "\n".join([
+        "FILE command usage:",
+        "  FILE SEND <user@ip> <file_path> [description]  - Send a file to a peer",
+        "  FILE ACCEPT <transfer_id>                      - Accept an incoming file offer",
+        "  FILE REJECT <transfer_id>                      - Reject an incoming file offer",
+        "  FILE LIST                                      - List pending file offers",
+        "  FILE STATUS                                    - Show active file transfers",
+    ])
+    
     def __init__(self, message_handler, peer_manager):
         self.message_handler = message_handler
         self.peer_manager = peer_manager
         self.running = False
         
+        # Line editing and history only make sense on a terminal
+        self._line_editing = sys.stdin.isatty() and readline is not None
+        if self._line_editing:
+            self._setup_line_editing()
+        
         # Set default verbose mode from settings
         self.message_handler.set_verbose_mode(DEFAULT_VERBOSE_MODE)
     
     def start_command_loop(self):
         """Start the main command processing loop"""
-        print(f"\nPeer-to-Peer Chat Ready!")
-        print(f"Commands: POST, DM, DMLIST, PROFILE, LIST, FOLLOW, UNFOLLOW, FOLLOWING, FOLLOWERS, GAME, FILE, GROUP, GROUPVIEW, FEED, LIKE, VERBOSE, QUIT")
-        print(f"Verbose mode: {'ON' if self.message_handler.verbose_mode else 'OFF'}")
+        print(f"{_BANNER}\nVerbose mode: {'ON' if self.message_handler.verbose_mode else 'OFF'}")
         
         self.running = True
         while self.running:
             try:
-                original_cmd = input("\nCommand (POST/DM/DMLIST/PROFILE/LIST/FOLLOW/UNFOLLOW/FOLLOWING/FOLLOWERS/GAME/FILE/GROUP/GROUPVIEW/FEED/LIKE/VERBOSE/QUIT): ").strip()
+                original_cmd = self._ask(_PROMPT).strip()
                 cmd = original_cmd.upper()
                 
-                if cmd == "QUIT" or cmd == "Q":
+                # Only main-loop commands go into history, never sub-prompt answers
+                if original_cmd and self._line_editing:
+                    readline.add_history(original_cmd)
+                
+                if cmd in self._QUIT_COMMANDS:
                     print("Logging out and revoking all tokens...")
                     
                     # Signal the peer to stop (this will trigger the shutdown process)
                     self.running = False
                     print("Goodbye!")
-                    
-                elif cmd == "VERBOSE" or cmd == "V":
-                    self._handle_verbose_command()
-                elif cmd == "POST" or cmd == "P":
-                    self._handle_post_command()
-                elif cmd == "DM" or cmd == "D":
-                    self._handle_dm_command()
-                elif cmd == "DMLIST" or cmd == "DL":
-                    self._handle_dmlist_command()
-                elif cmd == "PROFILE" or cmd == "PROF":
-                    self._handle_profile_command()
-                elif cmd == "FEED" or cmd == "F":
-                    self._handle_feed_command()
-                elif cmd == "LIKE" or cmd == "L":
-                    self._handle_like_command()
-                elif cmd == "LIST" or cmd == "LS":
-                    self._handle_list_command()
-                elif cmd == "FOLLOW":
-                    self._handle_follow_command()
-                elif cmd == "UNFOLLOW" or cmd == "UF":
-                    self._handle_unfollow_command()
-                elif cmd == "FOLLOWING":
-                    self._handle_following_command()
-                elif cmd == "FOLLOWERS":
-                    self._handle_followers_command()
-                elif cmd.startswith("GAME") or cmd == "G":
-                    self._handle_game_command(original_cmd)
-                elif cmd.startswith("FILE") or cmd == "FILE":
-                    self._handle_file_command(original_cmd)
-                elif cmd == "GROUP" or cmd == "G":
-                    self._handle_group_command()
-                elif cmd == "GROUPVIEW" or cmd == "GV":
-                    self._handle_group_overview()
-                elif cmd == "":
+                    continue
+                
+                if not cmd:
                     # Empty command, just continue
                     continue
-                else:
-                    print("Invalid command. Use POST, DM, DMLIST, PROFILE, LIST, FOLLOW, UNFOLLOW, FOLLOWING, FOLLOWERS, GAME, FILE, GROUP, GROUPVIEW, FEED, LIKE, VERBOSE, or QUIT")
-                    print("You can also use single letters: P, D, DL, PROF, LS, UF, G, GV, F, L, V, Q")
+                
+                # Plain commands must match the whole line
+                handler_name = self._COMMAND_DISPATCH.get(cmd)
+                if handler_name is not None:
+                    getattr(self, handler_name)()
+                    continue
+                
+                # GAME/FILE take arguments, so only their first word is matched
+                handler_name = self._PREFIX_DISPATCH.get(cmd.split(None, 1)[0])
+                if handler_name is not None:
+                    getattr(self, handler_name)(original_cmd)
+                    continue
+                
+                sys.stdout.write(_INVALID_HELP)
                     
             except KeyboardInterrupt:
                 print("\nGoodbye!")
@@ -96,11 +261,56 @@ class UserInterface:
         """Stop the command loop"""
         self.running = False
     
+    def _setup_line_editing(self):
+        """Enable tab completion of commands and peer IDs, and persistent command history"""
+        commands = sorted(self._QUIT_COMMANDS.union(self._COMMAND_DISPATCH, self._PREFIX_DISPATCH))
+        get_all_peers = self.peer_manager.get_all_peers
+        matches = []
+        
+        def complete(text, state):
+            # readline asks for state 0, 1, 2, ... per Tab; only build the list on the first
+            if state == 0:
+                prefix = text.upper()
+                matches[:] = [command for command in commands if command.startswith(prefix)]
+                # Iterate a copy; discovery may add peers while Tab is pressed
+                matches.extend(sorted(user_id for user_id in get_all_peers() if user_id.startswith(text)))
+            return matches[state] if state < len(matches) else None
+        
+        readline.set_completer(complete)
+        # Peer IDs contain '@' and '.', so only whitespace separates completion words
+        readline.set_completer_delims(" \t\n")
+        readline.parse_and_bind("tab: complete")
+        # input() would also record DM and post text typed at sub-prompts;
+        # start_command_loop adds the commands itself
+        readline.set_auto_history(False)
+        readline.set_history_length(COMMAND_HISTORY_LENGTH)
+        try:
+            readline.read_history_file(COMMAND_HISTORY_FILE)
+        except OSError:
+            pass
+        atexit.register(self._save_history)
+    
+    @staticmethod
+    def _save_history():
+        """Write the command history file, ignoring unwritable locations"""
+        try:
+            readline.write_history_file(COMMAND_HISTORY_FILE)
+        except OSError:
+            pass
+    
+    def _ask(self, prompt):
+        """Prompt the user and return one line of input without the newline"""
+        return input(prompt)
+    
+    def _yes(self, prompt):
+        """Ask a y/n question; any answer starting with y or Y counts as yes"""
+        return self._ask(prompt).lstrip()[:1] in ('y', 'Y')
+    
     def _handle_verbose_command(self):
         """Toggle verbose mode"""
-        current_verbose = self.message_handler.verbose_mode
-        self.message_handler.set_verbose_mode(not current_verbose)
-        print(f"Verbose mode: {'ON' if self.message_handler.verbose_mode else 'OFF'}")
+        verbose = not self.message_handler.verbose_mode
+        self.message_handler.set_verbose_mode(verbose)
+        print(f"Verbose mode: {'ON' if verbose else 'OFF'}")
     
     def _handle_post_command(self):
         """Handle POST (broadcast message) command"""
@@ -108,18 +318,18 @@ class UserInterface:
         follower_count = len(self.peer_manager.get_followers())
         if follower_count == 0:
             print("You have no followers. Your message won't be received by anyone.")
-            if not input("Continue anyway? (y/n): ").strip().lower().startswith('y'):
+            if not self._yes("Continue anyway? (y/n): "):
                 return
         else:
             print(f"Your message will be sent to {follower_count} follower(s).")
         
-        message = input("Message: ").strip()
+        message = self._ask("Message: ").strip()
         if not message:
             print("No message provided")
             return
             
         # Get TTL (Time To Live)
-        ttl_input = input("Time To Live in seconds (default 3600 = 1 hour): ").strip()
+        ttl_input = self._ask("Time To Live in seconds (default 3600 = 1 hour): ").strip()
         try:
             ttl = int(ttl_input) if ttl_input else 3600
             if ttl <= 0:
@@ -142,17 +352,17 @@ class UserInterface:
             print("No peers available. Use LIST to discover peers first.")
             return
         
-        print("Available peers:")
-        for user_id in peers.keys():
-            display_name = self.peer_manager.get_display_name(user_id)
-            print(f"  - {user_id} ({display_name})")
+        lines = ["Available peers:"]
+        for user_id, display_name, _, _, _ in self.peer_manager.snapshot_peers(peers):
+            lines.append(f"  - {user_id} ({display_name})")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        recipient = input("Recipient (user@ip): ").strip()
+        recipient = self._ask("Recipient (user@ip): ").strip()
         if not recipient:
             print("No recipient specified")
             return
         
-        message = input("Message: ").strip()
+        message = self._ask("Message: ").strip()
         if not message:
             print("No message provided")
             return
@@ -165,26 +375,30 @@ class UserInterface:
     
     def _handle_dmlist_command(self):
         """Handle DMLIST command - show DMs from a specific peer"""
+        # The ID set below iterates the peers, so take a copy discovery can't resize
         peers = self.peer_manager.get_all_peers()
         if not peers:
             print("No peers available. Use LIST to discover peers first.")
             return
         
-        # First, show peers with DM history
-        peers_with_dms = [peer_id for peer_id in self.peer_manager.direct_messages.keys() 
-                         if peer_id in peers or peer_id == self.peer_manager.user_id]
+        # First, show peers with DM history (known peers plus ourselves), sorted
+        # so the numbering is stable between runs
+        live_ids = peers.keys() | {self.peer_manager.user_id}
+        peers_with_dms = sorted(self.peer_manager.direct_messages.keys() & live_ids)
         
         if not peers_with_dms:
             print("You haven't exchanged DMs with any peers yet.")
             return
         
-        print("\nPeers with DM history:")
-        for idx, peer_id in enumerate(peers_with_dms, 1):
-            display_name = self.peer_manager.get_display_name(peer_id)
-            msg_count = len(self.peer_manager.direct_messages.get(peer_id, []))
-            print(f"  {idx}. {peer_id} ({display_name}) - {msg_count} messages")
+        direct_messages = self.peer_manager.direct_messages
+        lines = ["\nPeers with DM history:"]
+        for idx, (peer_id, display_name, _, _, _) in enumerate(
+                self.peer_manager.snapshot_peers(peers_with_dms), 1):
+            msg_count = len(direct_messages.get(peer_id, ()))
+            lines.append(f"  {idx}. {peer_id} ({display_name}) - {msg_count} messages")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        selection = input("\nEnter peer number or user@ip to view DMs: ").strip()
+        selection = self._ask("\nEnter peer number or user@ip to view DMs: ").strip()
         
         # Handle numeric selection
         try:
@@ -205,7 +419,7 @@ class UserInterface:
     
     def _handle_profile_command(self):
         """Handle PROFILE command"""
-        display_name = input("Display Name: ").strip()
+        display_name = self._ask("Display Name: ").strip()
         if not display_name:
             # Use username from user_id if available
             if '@' in self.peer_manager.user_id:
@@ -213,32 +427,42 @@ class UserInterface:
             else:
                 display_name = self.peer_manager.user_id
         
-        status = input("Status message: ").strip()
+        status = self._ask("Status message: ").strip()
         if not status:
             status = "Hello from P2P LSNP!"
         
-        add_avatar = input("Add profile picture? (y/n): ").strip().lower() == 'y'
+        add_avatar = self._yes("Add profile picture? (y/n): ")
         
         avatar_data = None
         avatar_type = None
         
         if add_avatar:
-            avatar_path = input("Enter path to image file (or press Enter to skip): ").strip()
-            if avatar_path and os.path.exists(avatar_path):
+            avatar_path = self._ask("Enter path to image file (or press Enter to skip): ").strip()
+            # One stat() answers existence, type and size together
+            st = None
+            if avatar_path:
                 try:
-                    file_size = os.path.getsize(avatar_path)
+                    st = os.stat(avatar_path)
+                except OSError:
+                    pass
+            if st is not None and stat.S_ISREG(st.st_mode):
+                try:
+                    file_size = st.st_size
                     if file_size > 20480:  # 20KB
                         print(f"Warning: File is {file_size} bytes. Large files may cause issues.")
-                        if input("Continue anyway? (y/n): ").strip().lower() != 'y':
+                        if not self._yes("Continue anyway? (y/n): "):
                             avatar_path = None
                     
                     if avatar_path:
-                        # Read and encode avatar
+                        # Read and encode avatar in 3-byte aligned chunks so no
+                        # padding lands mid-stream
+                        encoded = []
                         with open(avatar_path, 'rb') as f:
-                            avatar_bytes = f.read()
+                            for chunk in iter(functools.partial(f.read, _AVATAR_READ_CHUNK), b''):
+                                encoded.append(base64.b64encode(chunk))
                         
-                        avatar_data = base64.b64encode(avatar_bytes).decode('utf-8')
-                        avatar_type = mimetypes.guess_type(avatar_path)[0] or 'application/octet-stream'
+                        avatar_data = b''.join(encoded).decode('ascii')
+                        avatar_type = _guess_file_type(avatar_path)
                         
                         print(f"Avatar added: {avatar_type}, {len(avatar_data)} characters")
                         
@@ -258,18 +482,15 @@ class UserInterface:
             return
         
         if self.message_handler.verbose_mode:
-            peer_list = [f"{user_id} ({info['ip']}:{info['port']})" for user_id, info in peers.items()]
-            print(f"\n[KNOWN PEERS] ({len(peers)} peers):")
-            for peer_info in peer_list:
-                print(f"  - {peer_info}")
+            lines = [f"\n[KNOWN PEERS] ({len(peers)} peers):"]
+            lines.extend(f"  - {user_id} ({info['ip']}:{info['port']})" for user_id, info in peers.items())
         else:
-            print(f"\nOnline ({len(peers)}):")
-            for user_id in peers.keys():
-                display_name = self.peer_manager.get_display_name(user_id)
-                avatar_info = self.peer_manager.get_avatar_info(user_id)
-                following_status = " [Following]" if self.peer_manager.is_following(user_id) else ""
-                follower_status = " [Follower]" if self.peer_manager.is_follower(user_id) else ""
-                print(f"  - {display_name} ({user_id}){avatar_info}{following_status}{follower_status}")
+            lines = [f"\nOnline ({len(peers)}):"]
+            for user_id, display_name, avatar_info, is_following, is_follower in self.peer_manager.snapshot_peers(peers):
+                following_status = " [Following]" if is_following else ""
+                follower_status = " [Follower]" if is_follower else ""
+                lines.append(f"  - {display_name} ({user_id}){avatar_info}{following_status}{follower_status}")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def _handle_follow_command(self):
         """Handle FOLLOW command to follow a peer"""
@@ -278,13 +499,13 @@ class UserInterface:
             print("No peers available. Use LIST to discover peers first.")
             return
         
-        print("Available peers:")
-        for user_id in peers.keys():
-            display_name = self.peer_manager.get_display_name(user_id)
-            following = " [Following]" if self.peer_manager.is_following(user_id) else ""
-            print(f"  - {user_id} ({display_name}){following}")
+        lines = ["Available peers:"]
+        for user_id, display_name, _, is_following, _ in self.peer_manager.snapshot_peers(peers):
+            following = " [Following]" if is_following else ""
+            lines.append(f"  - {user_id} ({display_name}){following}")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        user_to_follow = input("User to follow (user@ip): ").strip()
+        user_to_follow = self._ask("User to follow (user@ip): ").strip()
         if not user_to_follow:
             print("No user specified")
             return
@@ -307,12 +528,12 @@ class UserInterface:
             print("You are not following anyone.")
             return
         
-        print("Users you are following:")
-        for user_id in following:
-            display_name = self.peer_manager.get_display_name(user_id)
-            print(f"  - {user_id} ({display_name})")
+        lines = ["Users you are following:"]
+        for user_id, display_name, _, _, _ in self.peer_manager.snapshot_peers(following):
+            lines.append(f"  - {user_id} ({display_name})")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        user_to_unfollow = input("User to unfollow (user@ip): ").strip()
+        user_to_unfollow = self._ask("User to unfollow (user@ip): ").strip()
         if not user_to_unfollow:
             print("No user specified")
             return
@@ -335,12 +556,11 @@ class UserInterface:
             print("You are not following anyone.")
             return
         
-        print(f"\nUsers you are following ({len(following)}):")
-        for user_id in following:
-            display_name = self.peer_manager.get_display_name(user_id)
-            avatar_info = self.peer_manager.get_avatar_info(user_id)
-            follower_status = " [Follower]" if self.peer_manager.is_follower(user_id) else ""
-            print(f"  - {display_name} ({user_id}){avatar_info}{follower_status}")
+        lines = [f"\nUsers you are following ({len(following)}):"]
+        for user_id, display_name, avatar_info, _, is_follower in self.peer_manager.snapshot_peers(following):
+            follower_status = " [Follower]" if is_follower else ""
+            lines.append(f"  - {display_name} ({user_id}){avatar_info}{follower_status}")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def _handle_followers_command(self):
         """Handle FOLLOWERS command to list users following you"""
@@ -349,12 +569,11 @@ class UserInterface:
             print("You have no followers.")
             return
         
-        print(f"\nUsers following you ({len(followers)}):")
-        for user_id in followers:
-            display_name = self.peer_manager.get_display_name(user_id)
-            avatar_info = self.peer_manager.get_avatar_info(user_id)
-            following_status = " [Following]" if self.peer_manager.is_following(user_id) else ""
-            print(f"  - {display_name} ({user_id}){avatar_info}{following_status}")
+        lines = [f"\nUsers following you ({len(followers)}):"]
+        for user_id, display_name, avatar_info, is_following, _ in self.peer_manager.snapshot_peers(followers):
+            following_status = " [Following]" if is_following else ""
+            lines.append(f"  - {display_name} ({user_id}){avatar_info}{following_status}")
+        sys.stdout.write("\n".join(lines) + "\n")
             
     def _handle_group_command(self):
         """Handle GROUP command with submenu"""
@@ -370,7 +589,7 @@ class UserInterface:
         print("  0. Back to main menu")
         
         try:
-            choice = input("\nSelect option (0-8): ").strip()
+            choice = self._ask("\nSelect option (0-8): ").strip()
             
             if choice == "1":
                 self._handle_group_create()
@@ -397,28 +616,27 @@ class UserInterface:
     
     def _handle_group_create(self):
         """Handle creating a new group"""
-        group_id = input("Enter a unique group ID: ").strip()
+        group_id = self._ask("Enter a unique group ID: ").strip()
         if not group_id:
             print("Group ID is required")
             return
             
-        group_name = input("Enter a group name: ").strip()
+        group_name = self._ask("Enter a group name: ").strip()
         if not group_name:
             print("Group name is required")
             return
             
-        members_input = input("Enter members (comma-separated user IDs): ").strip()
+        members_input = self._ask("Enter members (comma-separated user IDs): ").strip()
         members = []
         if members_input:
             members = [member.strip() for member in members_input.split(',') if member.strip()]
             
         # Check if members exist
-        peers = self.peer_manager.get_all_peers()
+        peers = self.peer_manager.peers_view()
         unknown_members = [member for member in members if member not in peers]
         if unknown_members:
             print(f"Warning: Some members are not in your peer list: {', '.join(unknown_members)}")
-            confirm = input("Continue anyway? (y/n): ").strip().lower()
-            if confirm != 'y':
+            if not self._yes("Continue anyway? (y/n): "):
                 print("Group creation cancelled")
                 return
                 
@@ -429,7 +647,7 @@ class UserInterface:
     def _handle_group_update(self):
         """Handle updating group membership"""
         # Get group ID
-        group_id = input("Enter group ID to update: ").strip()
+        group_id = self._ask("Enter group ID to update: ").strip()
         if not group_id:
             print("Group ID is required")
             return
@@ -446,13 +664,13 @@ class UserInterface:
             
         # Handle adding members
         add_members = []
-        add_input = input("Enter members to add (comma-separated, press Enter to skip): ").strip()
+        add_input = self._ask("Enter members to add (comma-separated, press Enter to skip): ").strip()
         if add_input:
             add_members = [member.strip() for member in add_input.split(',') if member.strip()]
             
         # Handle removing members
         remove_members = []
-        remove_input = input("Enter members to remove (comma-separated, press Enter to skip): ").strip()
+        remove_input = self._ask("Enter members to remove (comma-separated, press Enter to skip): ").strip()
         if remove_input:
             remove_members = [member.strip() for member in remove_input.split(',') if member.strip()]
             
@@ -467,7 +685,7 @@ class UserInterface:
     def _handle_group_message(self):
         """Handle sending a message to a group"""
         # Get group ID
-        group_id = input("Enter group ID to message: ").strip()
+        group_id = self._ask("Enter group ID to message: ").strip()
         if not group_id:
             print("Group ID is required")
             return
@@ -478,7 +696,7 @@ class UserInterface:
             return
             
         # Get message content
-        content = input("Enter your message: ").strip()
+        content = self._ask("Enter your message: ").strip()
         if not content:
             print("Message content is required")
             return
@@ -487,41 +705,52 @@ class UserInterface:
         sent_count = self.message_handler.send_group_message(group_id, content)
         print(f"Message sent to {sent_count} group members.")
     
-    def _handle_group_list(self):
-        """Handle listing all groups the user is a member of"""
-        self.message_handler.list_my_groups()
-            
-    def _handle_group_info(self):
-        """Handle showing details about a specific group"""
-        # Get group ID
+    def _prompt_select_group(self, show_message_counts=False):
+        """List the groups we belong to and return the chosen group ID, or None"""
         my_groups = self.peer_manager.get_my_groups()
         if not my_groups:
             print("You are not a member of any groups.")
-            return
-            
-        # Print groups for selection
-        print("\nYour Groups:")
+            return None
+        
+        lines = ["\nYour Groups:"]
         for i, group_id in enumerate(my_groups, 1):
             group = self.peer_manager.get_group(group_id)
             if not group:
                 continue
-            print(f"{i}. {group['name']} (ID: {group_id})")
-            
-        # Get group selection
-        selection = input("\nEnter group number or ID: ").strip()
+            if show_message_counts:
+                message_count = len(self.peer_manager.group_messages.get(group_id, ()))
+                lines.append(f"{i}. {group['name']} (ID: {group_id}) - {message_count} messages")
+            else:
+                lines.append(f"{i}. {group['name']} (ID: {group_id})")
+        sys.stdout.write("\n".join(lines) + "\n")
         
-        # Handle numeric selection
+        selection = self._ask("\nEnter group number or ID: ").strip()
+        return self._choose_group(selection, my_groups)
+    
+    def _choose_group(self, selection, group_ids):
+        """Resolve a 1-based group number or a group ID; print an error and return None if invalid"""
         group_id = None
         try:
             idx = int(selection) - 1
-            if 0 <= idx < len(my_groups):
-                group_id = my_groups[idx]
+            if 0 <= idx < len(group_ids):
+                group_id = group_ids[idx]
         except ValueError:
             # Try direct ID input
             group_id = selection
             
         if not group_id or group_id not in self.peer_manager.groups:
-            print(f"Invalid group selection")
+            print("Invalid group selection")
+            return None
+        return group_id
+    
+    def _handle_group_list(self):
+        """Handle listing all groups the user is a member of"""
+        self.message_handler.list_my_groups()
+            
+    def _handle_group_info(self):
+        """Handle showing details about a specific group"""
+        group_id = self._prompt_select_group()
+        if group_id is None:
             return
             
         # Show group details
@@ -529,76 +758,12 @@ class UserInterface:
     
     def _handle_group_view_messages(self):
         """Handle viewing messages in a specific group"""
-        # Get group ID
-        my_groups = self.peer_manager.get_my_groups()
-        if not my_groups:
-            print("You are not a member of any groups.")
-            return
-            
-        # Print groups for selection
-        print("\nYour Groups:")
-        for i, group_id in enumerate(my_groups, 1):
-            group = self.peer_manager.get_group(group_id)
-            if not group:
-                continue
-            message_count = len(self.peer_manager.group_messages.get(group_id, []))
-            print(f"{i}. {group['name']} (ID: {group_id}) - {message_count} messages")
-            
-        # Get group selection
-        selection = input("\nEnter group number or ID: ").strip()
-        
-        # Handle numeric selection
-        group_id = None
-        try:
-            idx = int(selection) - 1
-            if 0 <= idx < len(my_groups):
-                group_id = my_groups[idx]
-        except ValueError:
-            # Try direct ID input
-            group_id = selection
-            
-        if not group_id or group_id not in self.peer_manager.groups:
-            print(f"Invalid group selection")
-            return
-            
-        # Get message limit
-        limit_input = input("Number of messages to show (default 20): ").strip()
-        try:
-            limit = int(limit_input) if limit_input else 20
-        except ValueError:
-            limit = 20
-            
-        # Show group messages
-        self.message_handler.show_group_messages(group_id, limit)
-            
-        # Print groups for selection
-        print("\nYour Groups:")
-        for i, group_id in enumerate(my_groups, 1):
-            group = self.peer_manager.get_group(group_id)
-            if not group:
-                continue
-            message_count = len(self.peer_manager.group_messages.get(group_id, []))
-            print(f"{i}. {group['name']} (ID: {group_id}) - {message_count} messages")
-            
-        # Get group selection
-        selection = input("\nEnter group number or ID: ").strip()
-        
-        # Handle numeric selection
-        group_id = None
-        try:
-            idx = int(selection) - 1
-            if 0 <= idx < len(my_groups):
-                group_id = my_groups[idx]
-        except ValueError:
-            # Try direct ID input
-            group_id = selection
-            
-        if not group_id or group_id not in self.peer_manager.groups:
-            print(f"Invalid group selection")
+        group_id = self._prompt_select_group(show_message_counts=True)
+        if group_id is None:
             return
             
         # Get message limit
-        limit_input = input("Number of messages to show (default 20): ").strip()
+        limit_input = self._ask("Number of messages to show (default 20): ").strip()
         try:
             limit = int(limit_input) if limit_input else 20
         except ValueError:
@@ -608,7 +773,7 @@ class UserInterface:
         self.message_handler.show_group_messages(group_id, limit)
         
         # Format creation timestamp
-        import datetime
+        group = self.peer_manager.get_group(group_id)
         created_at = group['created_at']
         try:
             created_str = datetime.datetime.fromtimestamp(int(created_at)).strftime('%Y-%m-%d %H:%M:%S')
@@ -619,16 +784,15 @@ class UserInterface:
         print(f"Members ({len(group['members'])}):")
         
         # List all members
-        for member_id in group['members']:
-            display_name = self.peer_manager.get_display_name(member_id) or member_id
-            you_marker = " (You)" if member_id == self.peer_manager.user_id else ""
-            creator_marker = " (Creator)" if member_id == group['creator'] else ""
+        for member_id, display_name, is_self, is_creator in self.peer_manager.get_group_member_rows(group_id):
+            you_marker = " (You)" if is_self else ""
+            creator_marker = " (Creator)" if is_creator else ""
             print(f"  - {display_name} ({member_id}){you_marker}{creator_marker}")
             
     def _handle_group_leave(self):
         """Handle leaving a group"""
         # Get group ID
-        group_id = input("Enter group ID to leave: ").strip()
+        group_id = self._ask("Enter group ID to leave: ").strip()
         if not group_id:
             print("Group ID is required")
             return
@@ -645,8 +809,7 @@ class UserInterface:
             return
             
         # Confirm leaving
-        confirm = input(f"Are you sure you want to leave the group '{group['name']}'? (y/n): ").strip().lower()
-        if confirm != 'y':
+        if not self._yes(f"Are you sure you want to leave the group '{group['name']}'? (y/n): "):
             print("Operation cancelled")
             return
             
@@ -665,80 +828,82 @@ class UserInterface:
             print("You are not a member of any groups.")
             return
             
-        print(f"\n===== GROUP OVERVIEW =====")
-        print(f"You are a member of {len(my_groups)} groups:")
+        self_id = self.peer_manager.user_id
+        lines = ["\n===== GROUP OVERVIEW =====", f"You are a member of {len(my_groups)} groups:"]
+        
+        # Message senders repeat across groups; resolve each name once
+        name_cache = {}
+        get_name = self.peer_manager.get_display_name
+        
+        def display_name_of(user_id):
+            name = name_cache.get(user_id)
+            if name is None:
+                name = name_cache[user_id] = get_name(user_id) or user_id
+            return name
         
         # For each group, show basic info and recent messages
         for i, group_id in enumerate(my_groups, 1):
             group = self.peer_manager.get_group(group_id)
             if not group:
                 continue
-                
-            creator_status = " (Creator)" if group['creator'] == self.peer_manager.user_id else ""
-            member_count = len(group['members'])
-            message_count = len(self.peer_manager.group_messages.get(group_id, []))
             
-            print(f"\n{i}. {group['name']} (ID: {group_id}){creator_status}")
-            print(f"   Members: {member_count} | Messages: {message_count}")
+            creator = group['creator']
+            members = group['members']
+            creator_status = " (Creator)" if creator == self_id else ""
+            member_count = len(members)
+            # Raw stored list: counted here and scanned for the latest three below,
+            # so get_group_messages' sorted copy is never needed
+            messages = self.peer_manager.group_messages.get(group_id, ())
+            message_count = len(messages)
+            
+            lines.append(f"\n{i}. {group['name']} (ID: {group_id}){creator_status}")
+            lines.append(f"   Members: {member_count} | Messages: {message_count}")
             
             # Show members
-            print(f"   Members:")
-            for j, member_id in enumerate(list(group['members'])[:5], 1):
-                display_name = self.peer_manager.get_display_name(member_id) or member_id
-                you_marker = " (You)" if member_id == self.peer_manager.user_id else ""
-                creator_marker = " (Creator)" if member_id == group['creator'] else ""
-                print(f"     {j}. {display_name}{you_marker}{creator_marker}")
+            lines.append("   Members:")
+            member_rows = self.peer_manager.get_group_member_rows(group_id)
+            for j, (_, display_name, is_self, is_creator) in enumerate(member_rows[:5], 1):
+                you_marker = " (You)" if is_self else ""
+                creator_marker = " (Creator)" if is_creator else ""
+                lines.append(f"     {j}. {display_name}{you_marker}{creator_marker}")
                 
             # Show more members indicator if needed
-            if len(group['members']) > 5:
-                print(f"     ... and {len(group['members']) - 5} more members")
+            if member_count > 5:
+                lines.append(f"     ... and {member_count - 5} more members")
             
             # Show last 3 messages if any
-            messages = self.peer_manager.get_group_messages(group_id)
             if messages:
-                print(f"   Recent Messages:")
-                # Get last 3 messages
-                recent_msgs = sorted(messages, key=lambda x: x['timestamp'], reverse=True)[:3]
+                lines.append("   Recent Messages:")
+                # Get last 3 messages without sorting the whole history
+                recent_msgs = heapq.nlargest(3, messages, key=lambda x: x['timestamp'])
                 for msg in reversed(recent_msgs):
                     from_user = msg['from_user']
-                    display_name = self.peer_manager.get_display_name(from_user) or from_user
-                    you_marker = " (You)" if from_user == self.peer_manager.user_id else ""
+                    display_name = display_name_of(from_user)
+                    you_marker = " (You)" if from_user == self_id else ""
                     
                     # Format timestamp
-                    import datetime
-                    ts_str = datetime.datetime.fromtimestamp(msg['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+                    ts_str = _format_epoch_seconds(int(msg['timestamp']))
                     
-                    # Truncate content if too long
-                    content = msg['content']
-                    if len(content) > 50:
-                        content = content[:47] + "..."
+                    # Truncate content if too long (47 characters plus the ellipsis)
+                    content = _trunc(msg['content'], 47)
                         
-                    print(f"     [{ts_str}] {display_name}{you_marker}: {content}")
+                    lines.append(f"     [{ts_str}] {display_name}{you_marker}: {content}")
                     
-                if len(messages) > 3:
-                    print(f"     ... and {len(messages) - 3} more messages")
+                if message_count > 3:
+                    lines.append(f"     ... and {message_count - 3} more messages")
             else:
-                print(f"   No messages in this group yet")
+                lines.append("   No messages in this group yet")
                 
-        print(f"\n===== END OF GROUP OVERVIEW =====")
+        lines.append("\n===== END OF GROUP OVERVIEW =====")
+        sys.stdout.write("\n".join(lines) + "\n")
         
         # Ask if user wants to view details of a specific group
-        choice = input("\nView details of a specific group? Enter group number or ID (or press Enter to skip): ").strip()
+        choice = self._ask("\nView details of a specific group? Enter group number or ID (or press Enter to skip): ").strip()
         if not choice:
             return
             
-        # Handle numeric selection
-        group_id = None
-        try:
-            idx = int(choice) - 1
-            if 0 <= idx < len(my_groups):
-                group_id = my_groups[idx]
-        except ValueError:
-            # Try direct ID input
-            group_id = choice
-            
-        if not group_id or group_id not in self.peer_manager.groups:
-            print(f"Invalid group selection")
+        group_id = self._choose_group(choice, my_groups)
+        if group_id is None:
             return
             
         # Show submenu for selected group
@@ -764,16 +929,17 @@ class UserInterface:
         
         # Select group
         try:
-            choice = int(input("\nSelect group number: ").strip())
+            choice = int(self._ask("\nSelect group number: ").strip())
             if choice < 1 or choice > len(my_groups):
                 print("Invalid choice")
                 return
                 
             selected_group_id = my_groups[choice - 1]
             group = self.peer_manager.get_group(selected_group_id)
+            gname = group['name']
             
             # Get message content
-            content = input(f"Message to {group['name']}: ").strip()
+            content = self._ask(f"Message to {gname}: ").strip()
             if not content:
                 print("Message cannot be empty")
                 return
@@ -782,9 +948,9 @@ class UserInterface:
             sent_count = self.message_handler.send_group_message(selected_group_id, content)
             
             # Also display the message locally
-            display_name = self.peer_manager.get_display_name(self.peer_manager.user_id)
+            display_name = self.peer_manager.get_self_name()
             avatar_info = self.peer_manager.get_avatar_info(self.peer_manager.user_id)
-            print(f"\n[{group['name']}] {display_name}{avatar_info}: {content}")
+            print(f"\n[{gname}] {display_name}{avatar_info}: {content}")
             
             # Show result
             print(f"Message sent to {sent_count} group members")
@@ -814,56 +980,53 @@ class UserInterface:
         
         # Select group
         try:
-            choice = int(input("\nSelect group number: ").strip())
+            choice = int(self._ask("\nSelect group number: ").strip())
             if choice < 1 or choice > len(creator_groups):
                 print("Invalid choice")
                 return
                 
             selected_group_id = creator_groups[choice - 1]
             group = self.peer_manager.get_group(selected_group_id)
+            gname = group['name']
+            gmembers = group['members']
+            get_name = self.peer_manager.get_display_name
             
             # Show current members
-            print(f"\nCurrent members of {group['name']} ({len(group['members'])}):")
-            for member_id in group['members']:
-                display_name = self.peer_manager.get_display_name(member_id)
-                print(f"  - {display_name} ({member_id})")
+            print(f"\nCurrent members of {gname} ({len(gmembers)}):")
+            if gmembers:
+                print("\n".join(f"  - {get_name(m)} ({m})" for m in gmembers))
             
             # Add members
             print("\nAvailable peers to add:")
             peers = self.peer_manager.get_all_peers()
-            non_members = []
-            
-            for user_id, info in peers.items():
-                if user_id not in group['members']:
-                    display_name = self.peer_manager.get_display_name(user_id)
-                    print(f"  - {display_name} ({user_id})")
-                    non_members.append(user_id)
+            members_set = set(gmembers)
+            # Lists keep the display order; sets are only for validating input
+            non_members = [user_id for user_id in peers if user_id not in members_set]
+            non_members_set = set(non_members)
             
             add_members = []
             if non_members:
-                add_input = input("\nAdd members (comma-separated, leave empty to skip): ").strip()
+                print("\n".join(f"  - {get_name(m)} ({m})" for m in non_members))
+                add_input = self._ask("\nAdd members (comma-separated, leave empty to skip): ").strip()
                 if add_input:
-                    for member_id in add_input.split(','):
-                        member_id = member_id.strip()
-                        if member_id and self.peer_manager.is_peer_known(member_id) and member_id not in group['members']:
-                            add_members.append(member_id)
+                    # dict.fromkeys drops repeats but keeps the order the user typed
+                    candidates = dict.fromkeys(x.strip() for x in add_input.split(','))
+                    add_members = [m for m in candidates if m in non_members_set]
             
             # Remove members
             remove_members = []
-            removable_members = [m for m in group['members'] if m != self.peer_manager.user_id]
+            removable = [m for m in gmembers if m != self.peer_manager.user_id]
+            removable_set = set(removable)
             
-            if removable_members:
+            if removable:
                 print("\nMembers available for removal:")
-                for member_id in removable_members:
-                    display_name = self.peer_manager.get_display_name(member_id)
-                    print(f"  - {display_name} ({member_id})")
+                print("\n".join(f"  - {get_name(m)} ({m})" for m in removable))
                     
-                remove_input = input("\nRemove members (comma-separated, leave empty to skip): ").strip()
+                remove_input = self._ask("\nRemove members (comma-separated, leave empty to skip): ").strip()
                 if remove_input:
-                    for member_id in remove_input.split(','):
-                        member_id = member_id.strip()
-                        if member_id and member_id in group['members'] and member_id != self.peer_manager.user_id:
-                            remove_members.append(member_id)
+                    # dict.fromkeys drops repeats but keeps the order the user typed
+                    candidates = dict.fromkeys(x.strip() for x in remove_input.split(','))
+                    remove_members = [m for m in candidates if m in removable_set]
             
             # Confirm updates
             if not add_members and not remove_members:
@@ -876,7 +1039,7 @@ class UserInterface:
             if remove_members:
                 print(f"  Remove: {', '.join(remove_members)}")
                 
-            if input("Confirm these changes? (y/n): ").strip().lower() != 'y':
+            if not self._yes("Confirm these changes? (y/n): "):
                 print("Cancelled")
                 return
                 
@@ -910,23 +1073,24 @@ class UserInterface:
         
         # Select group
         try:
-            choice = int(input("\nSelect group number: ").strip())
+            choice = int(self._ask("\nSelect group number: ").strip())
             if choice < 1 or choice > len(member_groups):
                 print("Invalid choice")
                 return
                 
             selected_group_id = member_groups[choice - 1]
             group = self.peer_manager.get_group(selected_group_id)
+            gname = group['name']
             
             # Confirm
-            if input(f"Confirm leaving the group '{group['name']}'? (y/n): ").strip().lower() != 'y':
+            if not self._yes(f"Confirm leaving the group '{gname}'? (y/n): "):
                 print("Cancelled")
                 return
                 
             # Leave the group
             success, message = self.peer_manager.leave_group(selected_group_id)
             if success:
-                print(f"You have left the group '{group['name']}'")
+                print(f"You have left the group '{gname}'")
             else:
                 print(f"Error: {message}")
                 
@@ -955,25 +1119,26 @@ class UserInterface:
         
         # Select group
         try:
-            choice = int(input("\nSelect group number: ").strip())
+            choice = int(self._ask("\nSelect group number: ").strip())
             if choice < 1 or choice > len(creator_groups):
                 print("Invalid choice")
                 return
                 
             selected_group_id = creator_groups[choice - 1]
             group = self.peer_manager.get_group(selected_group_id)
+            gname = group['name']
             
             # Confirm
-            print(f"WARNING: Deleting the group '{group['name']}' is permanent.")
+            print(f"WARNING: Deleting the group '{gname}' is permanent.")
             print(f"You will need to notify members manually that the group has been deleted.")
-            if input(f"Type the group name to confirm deletion: ").strip() != group['name']:
+            if self._ask(f"Type the group name to confirm deletion: ").strip() != gname:
                 print("Confirmation failed. Group not deleted.")
                 return
                 
             # Delete the group
             success, message = self.peer_manager.delete_group(selected_group_id)
             if success:
-                print(f"Group '{group['name']}' has been deleted")
+                print(f"Group '{gname}' has been deleted")
             else:
                 print(f"Error: {message}")
                 
@@ -989,51 +1154,51 @@ class UserInterface:
             print(f"Group {group_id} not found")
             return
             
-        print(f"\n===== {group['name']} (ID: {group_id}) =====")
-        print("  1. View all members")
-        print("  2. View all messages")
-        print("  3. Send a message")
-        print("  0. Back to group overview")
+        sys.stdout.write(_GROUP_SUBMENU_TMPL.format(name=group['name'], gid=group_id))
         
-        choice = input("\nSelect option (0-3): ").strip()
+        choice = self._ask("\nSelect option (0-3): ").strip()
         
-        if choice == "1":
-            self.message_handler.show_group_members(group_id)
-        elif choice == "2":
-            self.message_handler.show_group_messages(group_id)
-        elif choice == "3":
-            # Get message content
-            content = input("Enter message: ").strip()
-            if not content:
-                print("Message content is required")
-                return
-                
-            # Send the message
-            sent_count = self.message_handler.send_group_message(group_id, content)
-            print(f"Message sent to {sent_count} group members")
+        action = _GROUP_DETAIL_ACTIONS.get(choice)
+        if action:
+            getattr(self, action)(group_id)
         elif choice == "0":
             return
         else:
             print("Invalid choice")
     
+    def _show_group_detail_members(self, group_id):
+        """Show all members of the group from the detail submenu"""
+        self.message_handler.show_group_members(group_id)
+    
+    def _show_group_detail_messages(self, group_id):
+        """Show all messages of the group from the detail submenu"""
+        self.message_handler.show_group_messages(group_id)
+    
+    def _send_group_detail_message(self, group_id):
+        """Send a message to the group from the detail submenu"""
+        # Get message content
+        content = self._ask("Enter message: ").strip()
+        if not content:
+            print("Message content is required")
+            return
+            
+        # Send the message
+        sent_count = self.message_handler.send_group_message(group_id, content)
+        print(f"Message sent to {sent_count} group members")
+    
     def _handle_feed_command(self):
         """Display posts from users, with options to like/unlike"""
-        import datetime
-        
         print("\n=== Feed Options ===")
         print("1. View your posts")
         print("2. View posts from users you follow")
         print("3. View liked posts")
         print("4. Cancel")
         
-        choice = input("Enter your choice (1-4): ").strip()
+        choice = self._ask("Enter your choice (1-4): ").strip()
         
-        if choice == "1":
-            self._show_my_posts()
-        elif choice == "2":
-            self._show_following_posts()
-        elif choice == "3":
-            self._show_liked_posts()
+        action = _FEED_ACTIONS.get(choice)
+        if action:
+            getattr(self, action)()
         elif choice == "4":
             return
         else:
@@ -1041,10 +1206,8 @@ class UserInterface:
     
     def _show_my_posts(self):
         """Show posts created by the user"""
-        import datetime
-        import time
-        
-        # Get posts from the peer manager
+        # Get posts from the peer manager (expired posts are already dropped)
+        current_time = int(time.time())
         all_posts = self.peer_manager.get_user_posts(self.peer_manager.user_id)
         
         if not all_posts:
@@ -1054,6 +1217,9 @@ class UserInterface:
         # Sort posts by timestamp (newest first)
         sorted_posts = sorted(all_posts.items(), key=lambda x: x[0], reverse=True)
         
+        # Fetch like counts for every post in one pass
+        likes_counts = self.peer_manager.get_post_likes_counts_bulk([ts for ts, _ in sorted_posts])
+        
         print("\n=== Your Posts ===")
         for idx, (timestamp, post_data) in enumerate(sorted_posts, 1):
             # Extract post data
@@ -1068,7 +1234,6 @@ class UserInterface:
                 expires_at = created_at + ttl
                 expires_str = datetime.datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M:%S')
                 # Calculate remaining time
-                current_time = int(time.time())
                 remaining_seconds = max(0, expires_at - current_time)
                 remaining_str = self._format_time_remaining(remaining_seconds)
             except Exception:
@@ -1077,7 +1242,7 @@ class UserInterface:
                 remaining_str = "Unknown"
                 
             # Get like count
-            like_count = self.peer_manager.get_post_likes_count(timestamp)
+            like_count = likes_counts.get(timestamp, 0)
             likes_label = f"{like_count} like{'s' if like_count != 1 else ''}"
             
             # Display post with index
@@ -1088,29 +1253,22 @@ class UserInterface:
     
     def _show_liked_posts(self):
         """Show posts liked by the user"""
-        import datetime
-        
         # Get liked posts
         liked_posts = self.peer_manager.liked_posts
         if not liked_posts:
             print("You haven't liked any posts yet.")
             return
         
-        # Parse liked posts (format: "user_id:timestamp")
+        # Liked posts are keyed by (user_id, timestamp)
         liked_data = []
-        for like_key in liked_posts:
-            try:
-                user_id, timestamp = like_key.split(':', 1)
+        for user_id, timestamp in liked_posts:
+            # Try to get actual content if available
+            post_content = "Unknown content"
+            user_posts = self.peer_manager.get_user_posts(user_id)
+            if timestamp in user_posts:
+                post_content = user_posts[timestamp]['content']
                 
-                # Try to get actual content if available
-                post_content = "Unknown content"
-                user_posts = self.peer_manager.get_user_posts(user_id)
-                if timestamp in user_posts:
-                    post_content = user_posts[timestamp]
-                    
-                liked_data.append((user_id, timestamp, post_content))
-            except ValueError:
-                continue
+            liked_data.append((user_id, timestamp, post_content))
                 
         if not liked_data:
             print("No liked posts found.")
@@ -1128,15 +1286,12 @@ class UserInterface:
                 ts_str = timestamp
                 
             # Truncate content if available
-            content_display = content[:30] + ("..." if len(content) > 30 else "")
+            content_display = _trunc(content)
             
             print(f"{idx}. [{ts_str}] {display_name}: {content_display} (ID: {timestamp})")
             
     def _show_following_posts(self):
         """Show posts from users you follow"""
-        import datetime
-        import time
-        
         # Get list of users you follow
         following = self.peer_manager.following
         
@@ -1144,7 +1299,8 @@ class UserInterface:
             print("You're not following anyone.")
             return
             
-        # Collect all posts from followed users
+        # Collect all posts from followed users (expired posts are already dropped)
+        current_time = int(time.time())
         all_posts = []
         for user_id in following:
             posts = self.peer_manager.get_user_posts(user_id)
@@ -1158,6 +1314,10 @@ class UserInterface:
         # Sort posts by timestamp (newest first)
         sorted_posts = sorted(all_posts, key=lambda x: x[1], reverse=True)
         
+        # Fetch like counts and our own likes once for the whole listing
+        likes_counts = self.peer_manager.get_post_likes_counts_bulk([ts for _, ts, _ in sorted_posts])
+        liked_set = self.peer_manager.liked_posts
+        
         # Display posts
         print("\n=== Posts from Users You Follow ===")
         for idx, (user_id, timestamp, post_data) in enumerate(sorted_posts, 1):
@@ -1173,7 +1333,6 @@ class UserInterface:
                 expires_at = created_at + ttl
                 expires_str = datetime.datetime.fromtimestamp(expires_at).strftime('%Y-%m-%d %H:%M:%S')
                 # Calculate remaining time
-                current_time = int(time.time())
                 remaining_seconds = max(0, expires_at - current_time)
                 remaining_str = self._format_time_remaining(remaining_seconds)
             except Exception:
@@ -1185,11 +1344,11 @@ class UserInterface:
             display_name = self.peer_manager.get_display_name(user_id) or user_id
             
             # Get like count
-            like_count = self.peer_manager.get_post_likes_count(timestamp)
+            like_count = likes_counts.get(timestamp, 0)
             likes_label = f"{like_count} like{'s' if like_count != 1 else ''}"
             
             # Check if user has liked this post
-            liked_status = " ❤️" if self.peer_manager.has_liked_post(user_id, timestamp) else ""
+            liked_status = " ❤️" if (user_id, timestamp) in liked_set else ""
             
             # Display post with index
             print(f"{idx}. [{ts_str}] {display_name}: {content} - {likes_label}{liked_status}")
@@ -1203,14 +1362,11 @@ class UserInterface:
         print("3. View post likes")
         print("4. Cancel")
         
-        choice = input("Enter your choice (1-4): ").strip()
+        choice = self._ask("Enter your choice (1-4): ").strip()
         
-        if choice == "1":
-            self._handle_like_post()
-        elif choice == "2":
-            self._handle_unlike_post()
-        elif choice == "3":
-            self._handle_view_likes()
+        action = _LIKE_ACTIONS.get(choice)
+        if action:
+            getattr(self, action)()
         elif choice == "4":
             return
         else:
@@ -1218,8 +1374,6 @@ class UserInterface:
     
     def _handle_like_post(self):
         """Handle liking a post"""
-        import datetime
-        
         # Get list of peers
         peers = self.peer_manager.known_peers
         if not peers:
@@ -1235,7 +1389,7 @@ class UserInterface:
             
         # Get user selection
         try:
-            user_idx = int(input("\nSelect user (0 to cancel): ").strip())
+            user_idx = int(self._ask("\nSelect user (0 to cancel): ").strip())
             if user_idx == 0:
                 return
                 
@@ -1256,6 +1410,7 @@ class UserInterface:
             sorted_posts = sorted(user_posts.items(), key=lambda x: x[0], reverse=True)
             
             # Display posts with formatting
+            liked_set = self.peer_manager.liked_posts
             print(f"\n=== Posts from {selected_user_id} ===")
             for idx, (timestamp, post_data) in enumerate(sorted_posts, 1):
                 # Extract post data
@@ -1264,7 +1419,6 @@ class UserInterface:
                 created_at = post_data['created_at']
                 
                 # Format timestamp for display
-                import time
                 try:
                     ts_str = datetime.datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M:%S')
                     # Calculate expiration time
@@ -1280,17 +1434,17 @@ class UserInterface:
                     remaining_str = "Unknown"
                 
                 # Truncate long content
-                truncated = content[:50] + ("..." if len(content) > 50 else "")
+                truncated = _trunc(content, 50)
                 
                 # Check if already liked
-                already_liked = self.peer_manager.has_liked_post(selected_user_id, timestamp)
+                already_liked = (selected_user_id, timestamp) in liked_set
                 like_status = " (Already Liked ❤️)" if already_liked else ""
                 
                 print(f"{idx}. [{ts_str}] {truncated}{like_status}  (ID: {timestamp})")
                 print(f"   Expires: {expires_str} ({remaining_str} remaining)")
                 
             # Get post selection
-            post_idx = int(input("\nSelect post to like (0 to cancel): ").strip())
+            post_idx = int(self._ask("\nSelect post to like (0 to cancel): ").strip())
             if post_idx == 0:
                 return
                 
@@ -1309,35 +1463,29 @@ class UserInterface:
             # Send like message
             success = self.message_handler.send_like_message(selected_user_id, selected_timestamp, action='LIKE')
             if success:
-                print(f"Liked post: \"{selected_content[:30]}...\"")
+                print(f"Liked post: \"{_trunc(selected_content)}\"")
                 
         except ValueError:
             print("Please enter a valid number")
     
     def _handle_unlike_post(self):
         """Handle unliking a post"""
-        import datetime
-        
         # Get liked posts
         liked_posts = self.peer_manager.liked_posts
         if not liked_posts:
             print("You haven't liked any posts yet.")
             return
         
-        # Parse liked posts (format: "user_id:timestamp")
+        # Liked posts are keyed by (user_id, timestamp)
         liked_data = []
-        for like_key in liked_posts:
-            try:
-                user_id, timestamp = like_key.split(':', 1)
-                # Try to get actual content if available
-                post_content = "Unknown content"
-                user_posts = self.peer_manager.get_user_posts(user_id)
-                if timestamp in user_posts:
-                    post_content = user_posts[timestamp]
+        for user_id, timestamp in liked_posts:
+            # Try to get actual content if available
+            post_content = "Unknown content"
+            user_posts = self.peer_manager.get_user_posts(user_id)
+            if timestamp in user_posts:
+                post_content = user_posts[timestamp]['content']
                 
-                liked_data.append((user_id, timestamp, post_content))
-            except ValueError:
-                continue
+            liked_data.append((user_id, timestamp, post_content))
                 
         if not liked_data:
             print("No liked posts found.")
@@ -1355,13 +1503,13 @@ class UserInterface:
                 ts_str = timestamp
                 
             # Truncate content if available
-            content_display = content[:30] + ("..." if len(content) > 30 else "")
+            content_display = _trunc(content)
             
             print(f"{idx}. Post by {display_name} - \"{content_display}\" [{ts_str}] (ID: {timestamp})")
             
         # Get post selection
         try:
-            post_idx = int(input("\nSelect post to unlike (0 to cancel): ").strip())
+            post_idx = int(self._ask("\nSelect post to unlike (0 to cancel): ").strip())
             if post_idx == 0:
                 return
                 
@@ -1393,17 +1541,17 @@ class UserInterface:
         sorted_posts = sorted(all_posts.items(), key=lambda x: x[0], reverse=True)
         
         print("\n=== Your Posts ===")
-        for idx, (timestamp, content) in enumerate(sorted_posts, 1):
+        for idx, (timestamp, post) in enumerate(sorted_posts, 1):
             # Get like count
             like_count = self.peer_manager.get_post_likes_count(timestamp)
             likes_label = f"{like_count} like{'s' if like_count != 1 else ''}"
             
             # Display post with index
-            print(f"{idx}. {content[:30]}... - {likes_label}")
+            print(f"{idx}. {_trunc(post['content'])} - {likes_label}")
             
         # Get post index
         try:
-            post_idx = int(input("Enter post number to view likes (0 to cancel): ").strip())
+            post_idx = int(self._ask("Enter post number to view likes (0 to cancel): ").strip())
             if post_idx == 0:
                 return
                 
@@ -1413,23 +1561,24 @@ class UserInterface:
                 
             # Get post timestamp
             post_timestamp = sorted_posts[post_idx - 1][0]
-            post_content = sorted_posts[post_idx - 1][1]
+            post_content = sorted_posts[post_idx - 1][1]['content']
             
             # Get likes
             likers = self.peer_manager.get_post_likes(post_timestamp)
             if not likers:
-                print(f"No likes for post: \"{post_content[:30]}...\"")
+                print(f"No likes for post: \"{_trunc(post_content)}\"")
                 return
                 
-            print(f"\nLikes for post \"{post_content[:30]}...\":")
-            for liker_id in likers:
-                display_name = self.peer_manager.get_display_name(liker_id) or liker_id
-                print(f"- {display_name} ({liker_id})")
+            get_name = self.peer_manager.get_display_name
+            print(f"\nLikes for post \"{_trunc(post_content)}\":")
+            print("\n".join(f"- {get_name(liker_id) or liker_id} ({liker_id})" for liker_id in likers))
                 
         except ValueError:
             print("Please enter a valid number")
             
-    def _format_time_remaining(self, seconds):
+    @staticmethod
+    @functools.lru_cache(maxsize=2048)
+    def _format_time_remaining(seconds):
         """Format seconds into a human-readable time string
         
         Args:
@@ -1454,100 +1603,100 @@ class UserInterface:
     def _handle_game_command(self, full_cmd):
         """Handle GAME command for Tic-Tac-Toe"""
         cmd_parts = full_cmd.split()
+        handler = self._GAME_HANDLERS.get(len(cmd_parts), '_game_invalid')
+        return getattr(self, handler)(cmd_parts)
+    
+    def _game_help(self, cmd_parts):
+        """Just "GAME": show game help and active games"""
+        print(self._GAME_HELP)
         
-        if len(cmd_parts) == 1:  # Just "GAME" command
-            # Show game help and active games
-            print("\n🎮 Tic-Tac-Toe Game Commands:")
-            print("  GAME <user@ip> O         - Invite user to play (you are O)")
-            print("  GAME <user@ip> X <pos>   - Invite and make first move")
-            print("  GAME <game_id> <pos>     - Make a move (position 0-8)")
-            print("  GAME LIST                - Show active games")
-            
-            active_games = self.message_handler.get_active_games()
-            if active_games:
-                print(f"\nActive games ({len(active_games)}):")
-                for game_id in active_games:
-                    game_info = self.message_handler.get_game_info(game_id)
-                    if game_info:
-                        player_x_name = self.peer_manager.get_display_name(game_info['player_x'])
-                        player_o_name = self.peer_manager.get_display_name(game_info['player_o'])
-                        current_turn = game_info['current_turn']
-                        status = game_info['status']
-                        print(f"  - {game_id}: {player_x_name} (X) vs {player_o_name} (O)")
-                        print(f"    Turn: {current_turn}, Status: {status}")
-            else:
-                print("\nNo active games.")
-            return
-        
-        elif len(cmd_parts) == 2:
-            if cmd_parts[1].upper() == "LIST":
-                # List active games
-                active_games = self.message_handler.get_active_games()
-                if active_games:
-                    print(f"\nActive games ({len(active_games)}):")
-                    for game_id in active_games:
-                        game_info = self.message_handler.get_game_info(game_id)
-                        if game_info:
-                            player_x_name = self.peer_manager.get_display_name(game_info['player_x'])
-                            player_o_name = self.peer_manager.get_display_name(game_info['player_o'])
-                            current_turn = game_info['current_turn']
-                            status = game_info['status']
-                            print(f"  - {game_id}: {player_x_name} (X) vs {player_o_name} (O)")
-                            print(f"    Turn: {current_turn}, Status: {status}")
-                            if status == 'active':
-                                self.message_handler._display_board(game_info['board'])
-                else:
-                    print("\nNo active games.")
-                return
+        self._print_active_games(show_board=False)
+    
+    def _game_two_args(self, cmd_parts):
+        """GAME LIST"""
+        if cmd_parts[1].upper() != "LIST":
+            return self._game_invalid(cmd_parts)
         
-        elif len(cmd_parts) == 3:
-            if '@' in cmd_parts[1] and cmd_parts[2].upper() in ['X', 'O']:
+        # List active games
+        self._print_active_games(show_board=True)
+    
+    def _game_three_args(self, cmd_parts):
+        """GAME <user@ip> X/O or GAME <game_id> <position>"""
+        _, target, arg = cmd_parts
+        if '@' in target:
+            chosen_symbol = arg.upper()
+            if chosen_symbol in self._GAME_SYMBOLS:
                 # Invite user with symbol choice: GAME user@ip X/O
-                target_user = cmd_parts[1]
-                chosen_symbol = cmd_parts[2].upper()
-                return self._send_game_invitation(target_user, chosen_symbol)
-            
-            else:
-                # Make a move: GAME <game_id> <position>
-                game_id = cmd_parts[1]
-                try:
-                    position = int(cmd_parts[2])
-                    if position < 0 or position > 8:
-                        print("Error: Position must be between 0 and 8")
-                        return
-                except ValueError:
-                    print("Error: Position must be a number between 0 and 8")
-                    return
-                
-                return self._make_game_move(game_id, position)
+                return self._send_game_invitation(target, chosen_symbol)
         
-        elif len(cmd_parts) == 4:
-            if '@' in cmd_parts[1] and cmd_parts[2].upper() == 'X':
-                # Invite and make first move: GAME user@ip X <position>
-                target_user = cmd_parts[1]
-                try:
-                    position = int(cmd_parts[3])
-                    if position < 0 or position > 8:
-                        print("Error: Position must be between 0 and 8")
-                        return
-                except ValueError:
-                    print("Error: Position must be a number between 0 and 8")
-                    return
-                
-                return self._send_game_invitation(target_user, 'X', position)
+        # Make a move: GAME <game_id> <position>
+        game_id = target
+        position = self._parse_position(arg)
+        if position is None:
+            return
         
-        # Invalid command format
-        print("Invalid GAME command format.")
-        print("Usage:")
-        print("  GAME                      - Show help and active games")
-        print("  GAME <user@ip> O          - Invite user (you are O)")
-        print("  GAME <user@ip> X <pos>    - Invite and make first move")
-        print("  GAME <game_id> <pos>      - Make a move (position 0-8)")
-        print("  GAME LIST                 - Show active games")
+        return self._make_game_move(game_id, position)
+    
+    def _game_four_args(self, cmd_parts):
+        """GAME <user@ip> X <position>"""
+        _, target_user, symbol, position_text = cmd_parts
+        if '@' not in target_user or symbol not in ('X', 'x'):
+            return self._game_invalid(cmd_parts)
+        
+        # Invite and make first move: GAME user@ip X <position>
+        position = self._parse_position(position_text)
+        if position is None:
+            return
+        
+        return self._send_game_invitation(target_user, 'X', position)
+    
+    def _game_invalid(self, cmd_parts):
+        """Invalid command format"""
+        print(self._GAME_USAGE)
+    
+    def _parse_position(self, text):
+        """Parse a board position, printing an error and returning None if invalid"""
+        # Common case: a single digit 0-8
+        if len(text) == 1 and text in self._POSITION_DIGITS:
+            return ord(text) - 48
+        try:
+            position = int(text)
+        except ValueError:
+            print("Error: Position must be a number between 0 and 8")
+            return None
+        if position not in self._VALID_POSITIONS:
+            print("Error: Position must be between 0 and 8")
+            return None
+        return position
+    
+    def _print_active_games(self, show_board):
+        """Print all active games, optionally with the board of each running game"""
+        games = self.message_handler.get_active_games_info()
+        if not games:
+            print("\nNo active games.")
+            return
+        
+        # Players usually appear in several games, so resolve every name in one pass
+        players = {game_info['player_x'] for _, game_info in games}
+        players.update(game_info['player_o'] for _, game_info in games)
+        names = {row[0]: row[1] for row in self.peer_manager.snapshot_peers(players)}
+        
+        lines = [f"\nActive games ({len(games)}):"]
+        for game_id, game_info in games:
+            status = game_info['status']
+            lines.append(f"  - {game_id}: {names[game_info['player_x']]} (X) vs {names[game_info['player_o']]} (O)")
+            lines.append(f"    Turn: {game_info['current_turn']}, Status: {status}")
+            if show_board and status == 'active':
+                # The board prints itself, so flush what we have before it
+                sys.stdout.write("\n".join(lines) + "\n")
+                lines = []
+                self.message_handler._display_board(game_info['board'])
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
     
     def _send_game_invitation(self, target_user, chosen_symbol='X', first_move_position=None):
         """Send a game invitation"""
-        peers = self.peer_manager.get_all_peers()
+        peers = self.peer_manager.peers_view()
         
         if not peers:
             print("No peers available. Use LIST to discover peers first.")
@@ -1556,9 +1705,14 @@ class UserInterface:
         if target_user not in peers:
             print(f"Error: Peer {target_user} not found or unreachable")
             print("Available peers:")
-            for user_id in peers.keys():
-                display_name = self.peer_manager.get_display_name(user_id)
-                print(f"  - {user_id} ({display_name})")
+            # Listing iterates, so take a copy discovery can't resize underneath us
+            peers = self.peer_manager.get_all_peers()
+            get_name = self.peer_manager.get_display_name
+            lines = [f"  - {user_id} ({get_name(user_id)})"
+                     for user_id in itertools.islice(peers, self._MAX_SUGGESTED_PEERS)]
+            if len(peers) > self._MAX_SUGGESTED_PEERS:
+                lines.append(f"  ... and {len(peers) - self._MAX_SUGGESTED_PEERS} more")
+            print("\n".join(lines))
             return
         
         success = self.message_handler.send_tictactoe_invite(target_user, chosen_symbol, first_move_position)
@@ -1576,6 +1730,15 @@ class UserInterface:
         else:
             print(f"Error: Could not send game invitation to {target_user}")
     
+    def _derive_game_roles(self, game_info):
+        """Get our symbol and the opponent's symbol, user ID and display name"""
+        if self.peer_manager.user_id == game_info['player_x']:
+            our_symbol, opponent_symbol, opponent_uid = 'X', 'O', game_info['player_o']
+        else:
+            our_symbol, opponent_symbol, opponent_uid = 'O', 'X', game_info['player_x']
+        return _GameRoles(our_symbol, opponent_symbol, opponent_uid,
+                          self.peer_manager.get_display_name(opponent_uid))
+    
     def _make_game_move(self, game_id, position):
         """Make a move in an active game"""
         # Check if game exists
@@ -1585,19 +1748,11 @@ class UserInterface:
             print("Use 'GAME LIST' to see active games")
             return
         
-        # Check if it's our turn
-        current_player = self.peer_manager.user_id
-        if current_player == game_info['player_x']:
-            our_symbol = 'X'
-        else:
-            our_symbol = 'O'
+        # Work out both sides of the game once
+        our_symbol, opponent_symbol, opponent_uid, opponent_name = self._derive_game_roles(game_info)
         
+        # Check if it's our turn
         if game_info['current_turn'] != our_symbol:
-            opponent_symbol = 'O' if our_symbol == 'X' else 'X'
-            if game_info['player_x'] == current_player:
-                opponent_name = self.peer_manager.get_display_name(game_info['player_o'])
-            else:
-                opponent_name = self.peer_manager.get_display_name(game_info['player_x'])
             print(f"Error: It's not your turn! Waiting for {opponent_name} ({opponent_symbol}) to play.")
             return
         
@@ -1608,35 +1763,26 @@ class UserInterface:
             return
         
         # Make the move
-        if self.message_handler.send_tictactoe_move(game_id, position):
+        game_info = self.message_handler.send_tictactoe_move(game_id, position)
+        if game_info:
             print(f"🎮 You played {our_symbol} at position {position}")
             # Display updated board
-            game_info = self.message_handler.get_game_info(game_id)
-            if game_info:
-                self.message_handler._display_board(game_info['board'])
-                
-                # Check if game ended
+            self.message_handler._display_board(game_info['board'])
+            
+            # send_tictactoe_move already marked finished games; only then
+            # is the board scanned again for the winner
+            if game_info['status'] == 'finished':
                 result = self.message_handler._check_game_result(game_info['board'])
-                if result['finished']:
-                    if result['winner']:
-                        if result['winner'] == our_symbol:
-                            print(f"🏆 Congratulations! You win!")
-                        else:
-                            if game_info['player_x'] == current_player:
-                                opponent_name = self.peer_manager.get_display_name(game_info['player_o'])
-                            else:
-                                opponent_name = self.peer_manager.get_display_name(game_info['player_x'])
-                            print(f"💔 {opponent_name} wins!")
+                if result['winner']:
+                    if result['winner'] == our_symbol:
+                        print(f"🏆 Congratulations! You win!")
                     else:
-                        print("🤝 It's a draw!")
+                        print(f"💔 {opponent_name} wins!")
                 else:
-                    # Game continues
-                    opponent_symbol = 'O' if our_symbol == 'X' else 'X'
-                    if game_info['player_x'] == current_player:
-                        opponent_name = self.peer_manager.get_display_name(game_info['player_o'])
-                    else:
-                        opponent_name = self.peer_manager.get_display_name(game_info['player_x'])
-                    print(f"Waiting for {opponent_name} ({opponent_symbol}) to play...")
+                    print("🤝 It's a draw!")
+            else:
+                # Game continues
+                print(f"Waiting for {opponent_name} ({opponent_symbol}) to play...")
         else:
             print("Error: Could not send move")
 
@@ -1646,26 +1792,12 @@ class UserInterface:
         parts = original_cmd.split()
         
         if len(parts) == 1:  # Just "FILE"
-            print("FILE command usage:")
-            print("  FILE SEND <user@ip> <file_path> [description]  - Send a file to a peer")
-            print("  FILE ACCEPT <transfer_id>                      - Accept an incoming file offer")
-            print("  FILE REJECT <transfer_id>                      - Reject an incoming file offer")
-            print("  FILE LIST                                      - List pending file offers")
-            print("  FILE STATUS                                    - Show active file transfers")
-            return
-        
-        subcommand = parts[1].upper()
-        
-        if subcommand == "SEND":
-            self._handle_file_send_command(parts)
-        elif subcommand == "ACCEPT":
-            self._handle_file_accept_command(parts)
-        elif subcommand == "REJECT":
-            self._handle_file_reject_command(parts)
-        elif subcommand == "LIST":
-            self._handle_file_list_command()
-        elif subcommand == "STATUS":
-            self._handle_file_status_command()
+            print(self._FILE_USAGE)
+            return
+        
+        handler = self._FILE_DISPATCH.get(parts[1].upper())
+        if handler:
+            getattr(self, handler)(parts)
         else:
             print("Invalid FILE subcommand. Use SEND, ACCEPT, REJECT, LIST, or STATUS")
     
@@ -1679,50 +1811,33 @@ class UserInterface:
         file_path = parts[3]
         description = " ".join(parts[4:]) if len(parts) > 4 else "No description"
         
-        # Convert relative path to absolute path
+        # Convert relative path to absolute path, reading the cwd only once
+        cwd = None
         if not os.path.isabs(file_path):
-            file_path = os.path.abspath(file_path)
+            cwd = os.getcwd()
+            file_path = os.path.normpath(os.path.join(cwd, file_path))
         
-        print(f"Debug: Original file path: {parts[3]}")
-        print(f"Debug: Resolved file path: {file_path}")
-        print(f"Debug: Current working directory: {os.getcwd()}")
-        print(f"Debug: File exists check: {os.path.exists(file_path)}")
-        
-        # Validate file path
-        if not os.path.exists(file_path):
+        # Validate file path with a single stat call
+        try:
+            st = os.stat(file_path)
+        except OSError:
             print(f"Error: File '{file_path}' not found")
-            print(f"Tried looking in: {os.getcwd()}")
+            print(f"Tried looking in: {cwd or os.getcwd()}")
             return
         
-        if not os.path.isfile(file_path):
+        if not stat.S_ISREG(st.st_mode):
             print(f"Error: '{file_path}' is not a file")
             return
         
         # Get file info
-        file_size = os.path.getsize(file_path)
+        file_size = st.st_size
         filename = os.path.basename(file_path)
-        file_type, _ = mimetypes.guess_type(file_path)
-        if not file_type:
-            file_type = "application/octet-stream"
-        
-        print(f"Debug: File path: {file_path}")
-        print(f"Debug: File size: {file_size} bytes")
-        print(f"Debug: Filename: {filename}")
-        print(f"Debug: File type: {file_type}")
-        
-        # Double-check by reading the file content
-        try:
-            with open(file_path, 'rb') as f:
-                test_content = f.read()
-            print(f"Debug: Actual file content length: {len(test_content)} bytes")
-            print(f"Debug: File content preview: {test_content[:100]}")
-        except Exception as e:
-            print(f"Debug: Error reading file for test: {e}")
+        file_type = _guess_file_type(file_path)
         
         # Check file size limit (50MB)
         max_size = 50 * 1024 * 1024  # 50MB
         if file_size > max_size:
-            print(f"Error: File too large ({self._format_file_size(file_size)}). Maximum size is 50MB")
+            print(f"Error: File too large ({format_file_size(file_size)}). Maximum size is 50MB")
             return
         
         # Parse target
@@ -1743,11 +1858,11 @@ class UserInterface:
         
         transfer_id = parts[2]
         
-        if transfer_id not in self.message_handler.pending_file_offers:
+        offer_info = self.message_handler.pending_file_offers.get(transfer_id)
+        if offer_info is None:
             print(f"Error: No pending file offer with ID '{transfer_id}'")
             return
         
-        offer_info = self.message_handler.pending_file_offers[transfer_id]
         print(f"Accepting file '{offer_info['filename']}' from {offer_info['sender_name']}")
         
         # Note: receiving_files structure will be initialized when first chunk arrives
@@ -1758,13 +1873,10 @@ class UserInterface:
             msg_dict = {
                 'TYPE': 'FILE_ACCEPT',
                 'transfer_id': transfer_id,
-                'receiver_name': self.message_handler.peer_manager.get_self_info().get('name', 'Unknown')
+                'receiver_name': self.message_handler.peer_manager.get_self_name()
             }
             
-            print(f"Debug: Sending FILE_ACCEPT to {offer_info['sender_addr']}")
-            print(f"Debug: Message: {msg_dict}")
-            
-            self.message_handler.network_manager.send_to_address(msg_dict, offer_info['sender_addr'][0], offer_info['sender_addr'][1])
+            self.message_handler.network_manager.enqueue_send(msg_dict, offer_info['sender_addr'][0], offer_info['sender_addr'][1])
             print(f"File acceptance sent. Waiting for file chunks...")
         except Exception as e:
             print(f"Error sending acceptance: {e}")
@@ -1779,11 +1891,12 @@ class UserInterface:
         
         transfer_id = parts[2]
         
-        if transfer_id not in self.message_handler.pending_file_offers:
+        # Take the offer out of the pending list in the same step as the lookup
+        offer_info = self.message_handler.pending_file_offers.pop(transfer_id, None)
+        if offer_info is None:
             print(f"Error: No pending file offer with ID '{transfer_id}'")
             return
         
-        offer_info = self.message_handler.pending_file_offers[transfer_id]
         print(f"Rejecting file '{offer_info['filename']}' from {offer_info['sender_name']}")
         
         # Send rejection message back to sender
@@ -1791,17 +1904,14 @@ class UserInterface:
             msg_dict = {
                 'TYPE': 'FILE_REJECT',
                 'transfer_id': transfer_id,
-                'receiver_name': self.message_handler.peer_manager.get_self_info().get('name', 'Unknown')
+                'receiver_name': self.message_handler.peer_manager.get_self_name()
             }
-            self.message_handler.network_manager.send_to_address(msg_dict, offer_info['sender_addr'][0], offer_info['sender_addr'][1])
-            
-            # Remove from pending offers
-            del self.message_handler.pending_file_offers[transfer_id]
+            self.message_handler.network_manager.enqueue_send(msg_dict, offer_info['sender_addr'][0], offer_info['sender_addr'][1])
             print("File rejection sent.")
         except Exception as e:
             print(f"Error sending rejection: {e}")
     
-    def _handle_file_list_command(self):
+    def _handle_file_list_command(self, parts):
         """Handle FILE LIST command"""
         pending = self.message_handler.pending_file_offers
         
@@ -1809,19 +1919,20 @@ class UserInterface:
             print("No pending file offers")
             return
         
-        print(f"\nPending File Offers ({len(pending)}):")
-        print("-" * 80)
-        for transfer_id, offer in pending.items():
-            print(f"ID: {transfer_id}")
-            print(f"  From: {offer['sender_name']}")
-            print(f"  File: {offer['filename']}")
-            print(f"  Size: {self._format_file_size(offer['file_size'])}")
-            print(f"  Type: {offer['file_type']}")
-            print(f"  Description: {offer['description']}")
-            print(f"  Time: {self._format_timestamp(offer['timestamp'])}")
-            print()
+        rows = [f"\nPending File Offers ({len(pending)}):", "-" * 80]
+        rows.extend(
+            f"ID: {transfer_id}\n"
+            f"  From: {offer['sender_name']}\n"
+            f"  File: {offer['filename']}\n"
+            f"  Size: {format_file_size(offer['file_size'])}\n"
+            f"  Type: {offer['file_type']}\n"
+            f"  Description: {offer['description']}\n"
+            f"  Time: {self._format_timestamp(offer['timestamp'])}\n"
+            for transfer_id, offer in pending.items()
+        )
+        sys.stdout.write("\n".join(rows) + "\n")
     
-    def _handle_file_status_command(self):
+    def _handle_file_status_command(self, parts):
         """Handle FILE STATUS command"""
         active_transfers = self.message_handler.active_file_transfers
         receiving = self.message_handler.receiving_files
@@ -1830,26 +1941,30 @@ class UserInterface:
             print("No active file transfers")
             return
         
+        lines = []
         if active_transfers:
-            print(f"\nOutgoing Transfers ({len(active_transfers)}):")
-            print("-" * 50)
+            lines.append(f"\nOutgoing Transfers ({len(active_transfers)}):")
+            lines.append("-" * 50)
             for transfer_id, transfer in active_transfers.items():
-                print(f"ID: {transfer_id}")
-                print(f"  File: {transfer['filename']}")
-                print(f"  To: {transfer.get('receiver_name', 'Unknown')}")
-                print(f"  Status: {transfer.get('status', 'In progress')}")
-                print()
+                lines.append(f"ID: {transfer_id}")
+                lines.append(f"  File: {transfer['filename']}")
+                lines.append(f"  To: {transfer.get('receiver_name', 'Unknown')}")
+                lines.append(f"  Status: {transfer.get('status', 'In progress')}")
+                lines.append("")
         
         if receiving:
-            print(f"\nIncoming Transfers ({len(receiving)}):")
-            print("-" * 50)
+            lines.append(f"\nIncoming Transfers ({len(receiving)}):")
+            lines.append("-" * 50)
             for transfer_id, transfer in receiving.items():
                 total = transfer['total_chunks']
                 received = transfer['received_count']
-                progress = (received / total * 100) if total > 0 else 0
-                print(f"ID: {transfer_id}")
-                print(f"  Progress: {received}/{total} chunks ({progress:.1f}%)")
-                print()
+                # Progress in tenths of a percent, rounded half up
+                progress = (received * 2000 // total + 1) // 2 if total > 0 else 0
+                lines.append(f"ID: {transfer_id}")
+                lines.append(f"  Progress: {received}/{total} chunks ({progress // 10}.{progress % 10}%)")
+                lines.append("")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def _send_file_offer(self, target_peer, file_path, filename, file_size, file_type, description):
         """Send a file offer to a peer"""
@@ -1858,9 +1973,6 @@ class UserInterface:
             transfer_id = f"file_{self.message_handler.file_transfer_counter}_{int(time.time())}"
             self.message_handler.file_transfer_counter += 1
             
-            print(f"Debug: Generated transfer ID: {transfer_id}")
-            print(f"Debug: Active transfers before: {list(self.message_handler.active_file_transfers.keys())}")
-            
             # Store transfer info
             self.message_handler.active_file_transfers[transfer_id] = {
                 'filename': filename,
@@ -1872,8 +1984,6 @@ class UserInterface:
                 'status': 'offering'
             }
             
-            print(f"Debug: Active transfers after: {list(self.message_handler.active_file_transfers.keys())}")
-            
             # Send offer message
             msg_dict = {
                 'TYPE': 'FILE_OFFER',
@@ -1882,31 +1992,18 @@ class UserInterface:
                 'file_size': str(file_size),
                 'file_type': file_type,
                 'description': description,
-                'sender_name': self.message_handler.peer_manager.get_self_info().get('name', 'Unknown')
+                'sender_name': self.message_handler.peer_manager.get_self_name()
             }
             
             self.message_handler.network_manager.send_to_address(msg_dict, target_peer['addr'][0], target_peer['addr'][1])
             print(f"📤 File offer sent to {target_peer.get('name', 'Unknown')} ({target_peer['addr'][0]})")
-            print(f"File: {filename} ({self._format_file_size(file_size)})")
+            print(f"File: {filename} ({format_file_size(file_size)})")
             print(f"Transfer ID: {transfer_id}")
             print("Waiting for response...")
             
         except Exception as e:
             print(f"Error sending file offer: {e}")
     
-    def _format_file_size(self, size_bytes):
-        """Format file size in human readable format"""
-        if size_bytes == 0:
-            return "0 B"
-        size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024.0 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        return f"{size_bytes:.1f} {size_names[i]}"
-    
     def _format_timestamp(self, timestamp):
         """Format timestamp for display"""
-        import datetime
-        dt = datetime.datetime.fromtimestamp(timestamp)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
+        return _format_epoch_seconds(int(timestamp))
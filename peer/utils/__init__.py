@@ -0,0 +1,4 @@
+"""
+Utilities Package
+Contains small helpers shared by the P2P system's modules
+"""
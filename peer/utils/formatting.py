@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Formatting Helpers Module
+Display formatting shared by the user interface and the message handler
+"""
+
+# Units used by format_file_size
+_SIZE_NAMES = ("B", "KB", "MB", "GB")
+
+
+def format_file_size(size_bytes):
+    """Format file size in human readable format"""
+    if size_bytes == 0:
+        return "0 B"
+    # Each unit is 2**10 of the previous one, so the unit index is the bit length in tens
+    i = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_NAMES) - 1)
+    return f"{size_bytes / (1 << (i * 10)):.1f} {_SIZE_NAMES[i]}"
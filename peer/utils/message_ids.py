@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Message ID Module
+Generates the MESSAGE_ID values attached to outgoing LSNP messages
+"""
+import random
+
+
+def generate_message_id():
+    """Generate a unique message ID"""
+    # IDs only need to be unique; the TOKEN field carries authentication,
+    # so a userspace PRNG avoids a getrandom() syscall per message
+    return f"{random.getrandbits(64):016x}"
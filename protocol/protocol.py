@@ -11,7 +11,8 @@
 
 class Protocol(object):
     def encode_message(data: dict) -> bytes:
-        return ('\n'.join(f"{k}:{v}" for k, v in data.items()) + '\n\n').encode('utf-8')
+        # A list comprehension lets join size the result in one pass (a generator is first copied to a list)
+        return ('\n'.join([f"{k}:{v}" for k, v in data.items()]) + '\n\n').encode('utf-8')
     # when decoding for every split with \n it further splits each pair using ':' then returns it
 
     # example original message earlier upon being encoded results to:
@@ -19,9 +20,13 @@ class Protocol(object):
     # b'<value>' means byte of <value>
     
     def decode_message(message:bytes)-> dict:
-        text = message.decode('utf-8')
-        pairs = (item.split(':', 1) for item in text.split('\n') if ':' in item)
-        return {k: v for k, v in pairs}
+        result = {}
+        for line in message.decode('utf-8').split('\n'):
+            # partition finds the first colon in one scan; lines without one are skipped
+            k, sep, v = line.partition(':')
+            if sep:
+                result[k] = v
+        return result
     
     # Example original message earlier decoded outputs a dictionary. This works by converting the bytes back to a UTF-8 string first, split string by newlines, then for each line containing a colon, split at first colon to create the key-value pairs then build and return a dictionary from those pairs
     # Output:
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test suite for PeerManager's cached group views
+Checks that an invalidation racing a rebuild never leaves stale data cached
+"""
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from peer.discovery.peer_manager import PeerManager
+
+
+class TestGroupMemberRows(unittest.TestCase):
+    """Test cases for PeerManager.get_group_member_rows"""
+
+    def setUp(self):
+        self.pm = PeerManager()
+        self.pm.set_user_id("alice@10.0.0.1")
+        self.pm.add_group("g1", "Group", "alice@10.0.0.1", ["alice@10.0.0.1", "bob@10.0.0.2"], 0)
+
+    def test_rows_are_reused(self):
+        """Test rows are built once and reused until a change"""
+        rows = self.pm.get_group_member_rows("g1")
+        self.assertIs(self.pm.get_group_member_rows("g1"), rows)
+        self.assertEqual(sorted(row[0] for row in rows), ["alice@10.0.0.1", "bob@10.0.0.2"])
+
+    def test_invalidate_during_build(self):
+        """Test rows built across an invalidation are not cached"""
+        get_display_name = self.pm.get_display_name
+
+        def renaming_get_display_name(user_id):
+            # Simulate the listener thread handling a PROFILE for alice after
+            # her row was built but before the rows are stored
+            if user_id == "bob@10.0.0.2" and "alice@10.0.0.1" not in self.pm.user_profiles:
+                self.pm.update_user_profile("alice@10.0.0.1", "Alice")
+            return get_display_name(user_id)
+
+        self.pm.get_display_name = renaming_get_display_name
+        self.pm.get_group_member_rows("g1")
+        self.pm.get_display_name = get_display_name
+
+        names = {row[0]: row[1] for row in self.pm.get_group_member_rows("g1")}
+        self.assertEqual(names["alice@10.0.0.1"], "Alice")
+
+
+
+class _InvalidatingMembers(list):
+    """Member list whose first lookup triggers a group change, like a racing GROUP_UPDATE"""
+
+    def __init__(self, members, on_lookup):
+        super().__init__(members)
+        self.on_lookup = on_lookup
+
+    def __contains__(self, item):
+        on_lookup, self.on_lookup = self.on_lookup, None
+        if on_lookup:
+            on_lookup()
+        return super().__contains__(item)
+
+
+class TestMyGroups(unittest.TestCase):
+    """Test cases for PeerManager.get_my_groups"""
+
+    def setUp(self):
+        self.pm = PeerManager()
+        self.pm.set_user_id("alice@10.0.0.1")
+
+    def test_changes_are_seen_immediately(self):
+        """Test a new group shows up on the next call"""
+        self.assertEqual(self.pm.get_my_groups(), [])
+        self.pm.add_group("g1", "Group", "alice@10.0.0.1", ["alice@10.0.0.1"], 0)
+        self.assertEqual(self.pm.get_my_groups(), ["g1"])
+
+    def test_invalidate_during_build(self):
+        """Test a list built across an invalidation is not cached"""
+        def leave():
+            self.pm.groups["g1"]["members"] = ["bob@10.0.0.2"]
+            self.pm.invalidate_group_cache()
+
+        self.pm.add_group("g1", "Group", "bob@10.0.0.2",
+                          _InvalidatingMembers(["alice@10.0.0.1", "bob@10.0.0.2"], leave), 0)
+        self.pm.get_my_groups()
+        self.assertEqual(self.pm.get_my_groups(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()